@@ -0,0 +1,138 @@
+"""Board access checks that do not load the board.
+
+A single query reads owner_id, is_public and an EXISTS over board_members
+(served by its (user_id, board_id) primary key). Results are cached per
+(board_id, user_id) and dropped on every worker when a board's owner,
+visibility or membership change commits.
+"""
+from fastapi import HTTPException
+from sqlalchemy import event, exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from .auth import Principal
+from .cache import TTLCache
+from .config import get_settings
+from .constants import BoardRoles
+from .models import Board, board_members
+from .websocket_manager import manager
+
+settings = get_settings()
+
+# (board_id, user_id) -> BoardRoles value
+access_cache = TTLCache(settings.access_cache_max_entries, settings.access_cache_ttl_seconds)
+
+
+def _drop_board(board_id: int) -> None:
+    access_cache.invalidate_where(lambda key: key[0] == board_id)
+
+
+ACCESS_SCOPE = "access"
+# session.info key: boards whose access changed in the session's open transaction
+_CHANGED_BOARDS = "access_changed_boards"
+
+manager.add_invalidation_hook(_drop_board, scope=ACCESS_SCOPE)
+
+
+def invalidate_board_access(board_id: int) -> None:
+    manager.invalidate_board(board_id, scope=ACCESS_SCOPE)
+
+
+def _mark_changed(board: Board) -> None:
+    # Dropped once the change commits: dropping it earlier lets a concurrent
+    # read cache the old role again until the TTL runs out
+    session = object_session(board)
+    if session is not None and board.id is not None:
+        session.info.setdefault(_CHANGED_BOARDS, set()).add(board.id)
+
+
+@event.listens_for(Board, "after_update")
+@event.listens_for(Board, "after_delete")
+def _invalidate_on_board_change(mapper, connection, target):
+    _mark_changed(target)
+
+
+@event.listens_for(Board.members, "append")
+@event.listens_for(Board.members, "remove")
+def _invalidate_on_membership_change(target, value, initiator):
+    _mark_changed(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for board_id in session.info.pop(_CHANGED_BOARDS, ()):
+        invalidate_board_access(board_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop(_CHANGED_BOARDS, None)
+
+
+def board_access_filter(board_id_column, user_id: int):
+    """SQL condition that is true when user_id can access the board in board_id_column.
+
+    Lets a mutation check access inside its own statement instead of a
+    separate lookup.
+    """
+    is_member = exists().where(
+        board_members.c.board_id == Board.id,
+        board_members.c.user_id == user_id,
+    )
+    return exists().where(
+        Board.id == board_id_column,
+        or_(Board.owner_id == user_id, Board.is_public == True, is_member),
+    )
+
+
+def board_role_statement(board_id: int, user_id: int):
+    """(owner_id, is_public, is member) of one board."""
+    is_member = exists().where(
+        board_members.c.board_id == Board.id,
+        board_members.c.user_id == user_id,
+    )
+    return select(Board.owner_id, Board.is_public, is_member).where(Board.id == board_id)
+
+
+async def get_board_role(board_id: int, user_id: int, db: AsyncSession) -> str:
+    """Return the user's BoardRoles value. Raises 404 if the board does not exist."""
+    key = (board_id, user_id)
+    role = access_cache.get(key)
+    if role is not None:
+        return role
+
+    result = await db.execute(board_role_statement(board_id, user_id))
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+
+    owner_id, is_public, member = row
+    if owner_id == user_id:
+        role = BoardRoles.OWNER
+    elif member:
+        role = BoardRoles.MEMBER
+    elif is_public:
+        role = BoardRoles.PUBLIC
+    else:
+        role = BoardRoles.NONE
+
+    access_cache.set(key, role)
+    return role
+
+
+async def require_board_access(
+    board_id: int,
+    db: AsyncSession,
+    user: Principal,
+    require_owner: bool = False
+) -> str:
+    """Verify user has access to the board and return their role."""
+    role = await get_board_role(board_id, user.id, db)
+
+    if require_owner and role != BoardRoles.OWNER:
+        raise HTTPException(status_code=403, detail="Only board owner can perform this action")
+
+    if role == BoardRoles.NONE:
+        raise HTTPException(status_code=403, detail="You don't have access to this board")
+
+    return role
@@ -1,27 +1,72 @@
+import hashlib
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event
 
+from .cache import TTLCache
 from .config import get_settings
 from .database import get_db
+from .hashing import PasswordHasher
+from .metrics import Gauge
 from .models import User
+from .websocket_manager import manager
+
+try:
+    import jwt as pyjwt
+except ImportError:  # pragma: no cover - optional speedup
+    pyjwt = None
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+password_hasher = PasswordHasher(pwd_context, settings.password_hash_workers, settings.password_hash_max_pending)
+Gauge(
+    "password_hashing",
+    "Password hashing pool state and timings (see PasswordHasher.stats)",
+    ("stat",),
+    collect=lambda: [((name,), value) for name, value in password_hasher.stats().items()],
+)
 security = HTTPBearer()
 
+# sha256(token) -> verified claims, expiring no later than the token itself
+token_cache = TTLCache(settings.token_cache_max_entries, settings.token_cache_ttl_seconds)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, as requests see it.
+
+    A plain immutable copy of the user's row: unlike an ORM ``User`` it can be
+    cached and shared between requests without being tied to a session.
+    """
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.username, user.email, user.is_active, user.created_at)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
 
+# (user_id, token) -> Principal verified by a previous request
+user_cache = TTLCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Returns (valid, new_hash); new_hash is set when the stored hash should be upgraded."""
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -31,18 +76,79 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
-def decode_token(token: str) -> Optional[dict]:
+def _verify_token(token: str) -> Optional[dict]:
+    """Check signature and expiry. PyJWT is preferred when installed: it is lighter than python-jose."""
+    if pyjwt is not None and settings.jwt_backend != "jose":
+        try:
+            return pyjwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        except pyjwt.PyJWTError:
+            return None
     try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        return payload
+        return jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
     except JWTError:
         return None
 
 
+def decode_token(token: str) -> Optional[dict]:
+    """Verified claims of a token, or None. Repeat calls with the same token skip the crypto.
+
+    The returned dict may be shared between callers and must not be modified.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload
+
+    payload = _verify_token(token)
+    if payload is None:
+        return None
+
+    exp = payload.get("exp")
+    if exp is not None:
+        remaining = float(exp) - time.time()
+        if remaining > 0:
+            token_cache.set(digest, payload, ttl=min(remaining, settings.token_cache_ttl_seconds))
+    return payload
+
+
+def _drop_user(user_id: int) -> None:
+    user_cache.invalidate_where(lambda key: key[0] == user_id)
+
+
+manager.add_user_invalidation_hook(_drop_user)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Forget cached principals for a user on every worker, e.g. after deactivation or a profile change."""
+    manager.invalidate_user(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_on_change(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+async def _load_user(user_id: int, token: str, db: AsyncSession) -> Optional[Principal]:
+    """Load the user for a verified token, from the cache when possible."""
+    key = (user_id, token)
+    cached = user_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is None:
+        return None
+    principal = Principal.from_user(user)
+    user_cache.set(key, principal)
+    return principal
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -57,8 +163,7 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    user = await _load_user(int(user_id), credentials.credentials, db)
     
     if user is None:
         raise credentials_exception
@@ -69,7 +174,7 @@ async def get_current_user(
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
     db: AsyncSession = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[Principal]:
     if credentials is None:
         return None
     
@@ -81,5 +186,4 @@ async def get_current_user_optional(
     if user_id is None:
         return None
     
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    return result.scalar_one_or_none()
+    return await _load_user(int(user_id), credentials.credentials, db)
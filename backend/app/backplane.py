@@ -0,0 +1,282 @@
+"""Broadcast backplanes that carry board events and presence between API workers.
+
+Every worker delivers its own broadcasts to its local sockets directly and
+publishes them on the backplane; peers deliver what they receive to their
+own sockets. Messages are small JSON envelopes produced by ConnectionManager.
+"""
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from .frames import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "collab_board_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+PG_NOTIFY_MAX_BYTES = 7999
+
+# Seconds between reconnection attempts after a backplane connection drops
+RECONNECT_DELAY_MIN = 1.0
+RECONNECT_DELAY_MAX = 30.0
+
+MessageHandler = Callable[[dict], None]
+
+
+def _next_delay(delay: float) -> float:
+    return min(delay * 2, RECONNECT_DELAY_MAX)
+
+
+class Backplane(ABC):
+    """Base class: publishing only enqueues, a single task sends in order."""
+
+    # Largest encoded message the transport carries; None for no limit
+    max_message_bytes: Optional[int] = None
+
+    def __init__(self, max_pending: int = 10000):
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._publisher: Optional[asyncio.Task] = None
+        self._on_message: Optional[MessageHandler] = None
+
+    async def start(self, on_message: MessageHandler) -> None:
+        self._on_message = on_message
+        await self._connect()
+        self._publisher = asyncio.create_task(self._publish_loop())
+
+    async def stop(self) -> None:
+        if self._publisher is not None:
+            # Give queued messages (e.g. the goodbye) a moment to go out
+            try:
+                await asyncio.wait_for(self._outbox.join(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            self._publisher.cancel()
+            try:
+                await self._publisher
+            except asyncio.CancelledError:
+                pass
+            self._publisher = None
+        await self._close()
+
+    def publish(self, message: dict, fallback: Optional[dict] = None) -> None:
+        """Queue a message for peers. ``fallback`` (small) is sent instead if it is too large."""
+        text = dumps(message)
+        if self.max_message_bytes is not None and len(text.encode()) > self.max_message_bytes:
+            if fallback is None:
+                logger.error(f"{message.get('kind')} message too large for the backplane, not delivered")
+                return
+            logger.warning(f"{message.get('kind')} message too large for the backplane, sending {fallback.get('kind')}")
+            text = dumps(fallback)
+        try:
+            self._outbox.put_nowait(text)
+        except asyncio.QueueFull:
+            logger.warning("Backplane outbox full, dropping message")
+
+    def _receive(self, data) -> None:
+        if self._on_message is None:
+            return
+        try:
+            message = loads(data)
+        except ValueError:
+            logger.warning("Ignoring malformed backplane message")
+            return
+        self._on_message(message)
+
+    async def _publish_loop(self) -> None:
+        while True:
+            text = await self._outbox.get()
+            try:
+                await self._send(text)
+            except Exception as e:
+                logger.error(f"Backplane publish failed: {e}")
+            finally:
+                self._outbox.task_done()
+
+    async def _connect(self) -> None:
+        pass
+
+    async def _close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def _send(self, text: str) -> None:
+        """Deliver one encoded message to peers. Errors are logged and the message dropped."""
+
+
+class InMemoryBackplane(Backplane):
+    """Single-process default: there are no peers, so nothing leaves the worker."""
+
+    async def start(self, on_message: MessageHandler) -> None:
+        self._on_message = on_message
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, message: dict, fallback: Optional[dict] = None) -> None:
+        pass
+
+    async def _send(self, text: str) -> None:
+        pass
+
+
+class PostgresBackplane(Backplane):
+    """LISTEN/NOTIFY on the application database via asyncpg.
+
+    Both connections are reopened when they drop (server restart, failover,
+    idle timeouts): the listening one by a watcher task, with backoff, and
+    the publishing one on the next send after its backoff has passed.
+    Messages sent by peers while the listener is down are lost.
+    """
+
+    max_message_bytes = PG_NOTIFY_MAX_BYTES
+
+    def __init__(self, dsn: str, **kwargs):
+        super().__init__(**kwargs)
+        # SQLAlchemy URLs carry the driver name; asyncpg wants a plain DSN
+        self.dsn = dsn.replace("postgresql+asyncpg://", "postgresql://", 1)
+        self._listen_conn = None
+        self._publish_conn = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._publish_delay = RECONNECT_DELAY_MIN
+        self._publish_retry_at = 0.0
+
+    async def _connect(self) -> None:
+        await self._listen()
+        self._publish_conn = await self._open()
+        self._watcher = asyncio.create_task(self._watch_loop())
+
+    async def _open(self):
+        import asyncpg
+
+        return await asyncpg.connect(self.dsn)
+
+    async def _listen(self) -> None:
+        conn = await self._open()
+        try:
+            await conn.add_listener(CHANNEL, self._on_notify)
+        except BaseException:
+            await conn.close()
+            raise
+        self._listen_conn = conn
+
+    async def _watch_loop(self) -> None:
+        delay = RECONNECT_DELAY_MIN
+        while True:
+            await asyncio.sleep(delay)
+            if self._listen_conn is not None and not self._listen_conn.is_closed():
+                continue
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = _next_delay(delay)
+                logger.error(f"Postgres backplane listener reconnect failed, retrying in {delay:.0f}s: {e}")
+                continue
+            logger.info("Postgres backplane listener reconnected")
+            delay = RECONNECT_DELAY_MIN
+
+    async def _close(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+        for conn in (self._listen_conn, self._publish_conn):
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        self._listen_conn = self._publish_conn = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self._receive(payload)
+
+    async def _publisher_conn(self):
+        if self._publish_conn is not None and not self._publish_conn.is_closed():
+            return self._publish_conn
+        if time.monotonic() < self._publish_retry_at:
+            raise ConnectionError("Postgres backplane publisher is reconnecting")
+        try:
+            self._publish_conn = await self._open()
+        except Exception:
+            self._publish_retry_at = time.monotonic() + self._publish_delay
+            self._publish_delay = _next_delay(self._publish_delay)
+            raise
+        logger.info("Postgres backplane publisher reconnected")
+        self._publish_delay = RECONNECT_DELAY_MIN
+        return self._publish_conn
+
+    async def _send(self, text: str) -> None:
+        if len(text.encode()) > PG_NOTIFY_MAX_BYTES:
+            logger.error("Event too large for NOTIFY, not delivered to other workers")
+            return
+        conn = await self._publisher_conn()
+        await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, text)
+
+
+class RedisBackplane(Backplane):
+    """Redis PUBLISH/SUBSCRIBE. Works against any server speaking the Redis protocol."""
+
+    def __init__(self, url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self._redis = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def _connect(self) -> None:
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(CHANNEL)
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self) -> None:
+        delay = RECONNECT_DELAY_MIN
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis-py reconnects and resubscribes on the next call
+                logger.error(f"Redis backplane read failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = _next_delay(delay)
+                continue
+            delay = RECONNECT_DELAY_MIN
+            if message is not None and message.get("type") == "message":
+                self._receive(message["data"])
+
+    async def _close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(CHANNEL)
+            await self._pubsub.close()
+        if self._redis is not None:
+            await self._redis.close()
+        self._pubsub = self._redis = None
+
+    async def _send(self, text: str) -> None:
+        await self._redis.publish(CHANNEL, text)
+
+
+def create_backplane(url: str) -> Backplane:
+    """Pick a backplane from BACKPLANE_URL (memory://, postgresql://..., redis://...)."""
+    if not url or url.startswith("memory://"):
+        return InMemoryBackplane()
+    if url.startswith(("postgres://", "postgresql://", "postgresql+asyncpg://")):
+        return PostgresBackplane(url)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackplane(url)
+    raise ValueError(f"Unsupported backplane URL: {url}")
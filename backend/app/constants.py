@@ -7,10 +7,16 @@ class WSEventTypes:
     TASK_UPDATED = "task_updated"
     TASK_DELETED = "task_deleted"
     TASK_MOVED = "task_moved"
+    TASKS_BATCH = "tasks_batch"
     USER_JOINED = "user_joined"
     USER_LEFT = "user_left"
     CURSOR_MOVE = "cursor_move"
+    CURSORS = "cursors"
     CONNECTION_ESTABLISHED = "connection_established"
+    PRESENCE = "presence"
+    RESYNC = "resync"
+    PING = "ping"
+    PONG = "pong"
     ERROR = "error"
 
 
@@ -18,6 +24,29 @@ class WSMessageTypes:
     """WebSocket incoming message type constants."""
     CURSOR_MOVE = "cursor_move"
     PING = "ping"
+    PONG = "pong"
+    PRESENCE_SYNC = "presence_sync"
+
+
+class WSSubprotocols:
+    """Frame encodings a client can negotiate via Sec-WebSocket-Protocol."""
+    MSGPACK = "collab.msgpack.v1"
+    JSON = "collab.json.v1"
+
+
+class WSOverflowPolicies:
+    """What to do when a connection's outbound queue is full."""
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+class BoardRoles:
+    """How a user is allowed to reach a board."""
+    OWNER = "owner"
+    MEMBER = "member"
+    PUBLIC = "public"
+    NONE = "none"
 
 
 class ErrorMessages:
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with board_id and user_id -> cursor, or None for a cursor that is gone
+FlushCallback = Callable[[int, Dict[str, Optional[dict]]], Awaitable[None]]
+
+
+class CursorAggregator:
+    """Buffers the latest cursor per user and flushes one batch per board per tick.
+
+    Cursor traffic then costs one frame per viewer per tick instead of one
+    frame per viewer per mouse move. Positions equal to the last flushed one
+    are skipped. The tick task only runs while there is something to send.
+    """
+
+    def __init__(self, flush: FlushCallback, tick_hz: float):
+        self._flush = flush
+        self.interval = 1.0 / tick_hz
+        self._pending: Dict[int, Dict[str, Optional[dict]]] = {}  # board_id -> user_id -> cursor
+        self._last_sent: Dict[int, Dict[str, dict]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, board_id: int, user_id: str, cursor: dict) -> None:
+        if self._last_sent.get(board_id, {}).get(user_id) == cursor:
+            # Moved back to where everyone already sees it
+            self._pending.get(board_id, {}).pop(user_id, None)
+            return
+
+        self._pending.setdefault(board_id, {})[user_id] = cursor
+        self._schedule()
+
+    def remove(self, board_id: int, user_id: str) -> None:
+        """Forget a user's cursor and send the board a null entry for it, so clients drop it."""
+        self.forget(board_id, user_id)
+        self._pending.setdefault(board_id, {})[user_id] = None
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def forget(self, board_id: int, user_id: Optional[str] = None) -> None:
+        """Drop buffered state for a user, or for the whole board."""
+        if user_id is None:
+            self._pending.pop(board_id, None)
+            self._last_sent.pop(board_id, None)
+            return
+        self._pending.get(board_id, {}).pop(user_id, None)
+        self._last_sent.get(board_id, {}).pop(user_id, None)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+
+            pending, self._pending = self._pending, {}
+            pending = {board_id: cursors for board_id, cursors in pending.items() if cursors}
+            if not pending:
+                return
+
+            for board_id, cursors in pending.items():
+                last_sent = self._last_sent.setdefault(board_id, {})
+                for user_id, cursor in cursors.items():
+                    if cursor is None:
+                        last_sent.pop(user_id, None)
+                    else:
+                        last_sent[user_id] = cursor
+                try:
+                    await self._flush(board_id, cursors)
+                except Exception as e:
+                    logger.error(f"Cursor flush failed for board {board_id}: {e}")
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
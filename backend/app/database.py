@@ -1,11 +1,88 @@
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import get_settings
+from .metrics import Counter, Gauge, instrument_engine
 
 settings = get_settings()
 
-engine = create_async_engine(settings.database_url, echo=settings.debug)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records checkout waits and overflow use, to spot pool starvation."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+        self.peak_overflow = max(self.peak_overflow, self.overflow())
+        return connection
+
+    def stats(self) -> Dict[str, float]:
+        checkouts = self.checkouts or 1
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": max(self.peak_overflow, 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_seconds_total / checkouts * 1000, 3),
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+        }
+
+
+def _engine_options() -> dict:
+    url = make_url(settings.database_url)
+    if url.get_backend_name() == "sqlite":
+        # Scratch/local databases keep SQLAlchemy's default (non-queue) pool
+        return {"echo": settings.debug}
+
+    options = {
+        "echo": settings.debug,
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            # SQLAlchemy's cache of prepared statements, and asyncpg's own
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "statement_cache_size": settings.db_statement_cache_size,
+        }
+    return options
+
+
+engine = create_async_engine(settings.database_url, **_engine_options())
+instrument_engine(engine.sync_engine)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -22,5 +99,46 @@ async def get_db():
 
 
 async def init_db():
+    """Create all tables directly from the models.
+
+    Only for scratch databases (benchmarks, local experiments); real
+    databases are managed with Alembic: ``alembic upgrade head``.
+    """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+def pool_stats() -> Dict[str, float]:
+    pool = engine.pool
+    return pool.stats() if isinstance(pool, InstrumentedPool) else {}
+
+
+def _pool_counter(attribute: str) -> List[Tuple[Tuple[str, ...], float]]:
+    pool = engine.pool
+    return [((), getattr(pool, attribute))] if isinstance(pool, InstrumentedPool) else []
+
+
+# Cumulative stats are exported as counters (rate() applies), the rest as gauges
+POOL_COUNTER_STATS = frozenset({"checkouts", "timeouts"})
+
+db_pool = Gauge(
+    "db_pool",
+    "Connection pool state and high-water marks (see InstrumentedPool.stats)",
+    ("stat",),
+    collect=lambda: [((name,), value) for name, value in pool_stats().items() if name not in POOL_COUNTER_STATS],
+)
+Counter(
+    "db_pool_checkouts_total",
+    "Connections checked out of the pool",
+    collect=lambda: _pool_counter("checkouts"),
+)
+Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT",
+    collect=lambda: _pool_counter("timeouts"),
+)
+Counter(
+    "db_pool_wait_seconds_total",
+    "Time spent waiting for a pool connection",
+    collect=lambda: _pool_counter("wait_seconds_total"),
+)
@@ -0,0 +1,69 @@
+"""Per-board logs of recent task events, used to replay what a reconnecting client missed.
+
+Each worker numbers the events it delivers for a board 1, 2, 3, ... in
+delivery order. Numbers are only meaningful together with the log's epoch,
+which changes whenever the log is (re)created: a different worker, a
+restart or an evicted log all yield a new epoch, and the client resyncs.
+"""
+import uuid
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Deque, List, Optional
+
+from .frames import Frame
+
+
+class BoardEventLog:
+    """Ring buffer of the last ``maxlen`` sequenced frames of one board."""
+
+    def __init__(self, maxlen: int):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._frames: Deque[Frame] = deque(maxlen=maxlen)
+
+    def append(self, frame: Frame) -> Frame:
+        """Stamp the frame with the next sequence number and keep it."""
+        self.seq += 1
+        stamped = frame.with_seq(self.seq)
+        self._frames.append(stamped)
+        return stamped
+
+    def since(self, seq: int) -> Optional[List[Frame]]:
+        """Frames after ``seq``, or None if some of them are no longer in the buffer."""
+        if seq < 0 or seq > self.seq:
+            return None
+        oldest = self.seq - len(self._frames) + 1
+        if seq + 1 < oldest:
+            return None
+        return list(islice(self._frames, seq + 1 - oldest, None))
+
+
+class EventLogs:
+    """Board event logs of this worker, least recently written evicted first."""
+
+    def __init__(self, maxlen: int, max_boards: int):
+        self.maxlen = maxlen
+        self.max_boards = max_boards
+        self._logs: "OrderedDict[int, BoardEventLog]" = OrderedDict()
+
+    def get(self, board_id: int) -> BoardEventLog:
+        log = self._logs.get(board_id)
+        if log is None:
+            log = self._logs[board_id] = BoardEventLog(self.maxlen)
+            while len(self._logs) > self.max_boards:
+                self._logs.popitem(last=False)
+        return log
+
+    def append(self, board_id: int, frame: Frame) -> Frame:
+        log = self.get(board_id)
+        self._logs.move_to_end(board_id)
+        return log.append(frame)
+
+    def reset(self, board_id: int) -> BoardEventLog:
+        """Start a board's log over under a new epoch, for when events were lost.
+
+        Clients resuming from the old epoch then get a resync instead of a
+        replay with a hole in it.
+        """
+        self._logs.pop(board_id, None)
+        return self.get(board_id)
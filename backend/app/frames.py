@@ -0,0 +1,124 @@
+"""Pre-serialized WebSocket frames.
+
+A frame is encoded at most once per encoding no matter how many sockets it
+is sent to. orjson is used when installed; the stdlib encoder is the
+fallback. MessagePack (for clients negotiating the binary subprotocol) needs
+the optional msgpack package.
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Optional, Union
+
+from .constants import WSEventTypes
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - binary subprotocol disabled
+    msgpack = None
+
+
+# Events carrying one task's full state: a newer one supersedes any older one for the task
+TASK_STATE_EVENTS = frozenset({
+    WSEventTypes.TASK_CREATED,
+    WSEventTypes.TASK_UPDATED,
+    WSEventTypes.TASK_MOVED,
+    WSEventTypes.TASK_DELETED,
+})
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> str:
+    """Serialize to a compact JSON string."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode()
+    return json.dumps(obj, separators=(",", ":"), default=_default)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def packb(obj: Any) -> bytes:
+    """Serialize to MessagePack; dates and enums are encoded as in JSON."""
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False)
+
+
+class Frame:
+    """A WebSocket event that is serialized once and shared by every recipient."""
+
+    __slots__ = ("type", "payload", "timestamp", "seq", "coalesce_key", "_text", "_binary")
+
+    def __init__(self, type: str, payload: dict, timestamp: Optional[str] = None, seq: Optional[int] = None):
+        self.type = type
+        self.payload = payload
+        self.timestamp = timestamp if timestamp is not None else datetime.utcnow().isoformat()
+        # Position in the board's event log on this worker, if the event is logged
+        self.seq = seq
+        # Frames with the same key are merged in a backed-up send queue (see ``merge``)
+        if type in TASK_STATE_EVENTS:
+            self.coalesce_key = ("task", payload.get("id"))
+        elif type == WSEventTypes.CURSORS:
+            self.coalesce_key = (type,)
+        else:
+            subject = payload.get("user_id")
+            self.coalesce_key = (type, subject) if subject is not None else None
+        self._text: Optional[str] = None
+        self._binary: Optional[bytes] = None
+
+    @classmethod
+    def from_message(cls, message: dict) -> "Frame":
+        return cls(message["type"], message.get("payload") or {}, message.get("timestamp"), message.get("seq"))
+
+    def with_seq(self, seq: int) -> "Frame":
+        return Frame(self.type, self.payload, self.timestamp, seq)
+
+    def merge(self, newer: "Frame") -> "Frame":
+        """One frame standing for this frame followed by ``newer`` (same ``coalesce_key``)."""
+        if self.type == WSEventTypes.CURSORS:
+            # Each batch only has the users who moved since the previous one
+            cursors = {**self.payload.get("cursors", {}), **newer.payload.get("cursors", {})}
+            return Frame(self.type, {"cursors": cursors}, newer.timestamp)
+        # Keep the older seq: the merged frame is sent where the older one was queued,
+        # so a client resuming from it has events replayed rather than skipped
+        if self.type == WSEventTypes.TASK_CREATED and newer.type != WSEventTypes.TASK_DELETED:
+            # Still news to the client: announce the task with its latest state
+            return Frame(self.type, newer.payload, newer.timestamp, self.seq)
+        return Frame(newer.type, newer.payload, newer.timestamp, self.seq)
+
+    @property
+    def message(self) -> dict:
+        message = {"type": self.type, "payload": self.payload, "timestamp": self.timestamp}
+        if self.seq is not None:
+            message["seq"] = self.seq
+        return message
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = dumps(self.message)
+        return self._text
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = packb(self.message)
+        return self._binary
@@ -0,0 +1,90 @@
+"""Password hashing off the event loop.
+
+bcrypt is deliberately slow (tens to hundreds of milliseconds per call).
+Running it inline in an async handler would stall every request and
+WebSocket broadcast on the worker. Calls run on a small dedicated thread
+pool instead. bcrypt releases the GIL while hashing, so threads do run in
+parallel. Requests beyond the pool plus a bounded backlog are rejected with
+503 rather than queued without limit.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """Runs a passlib CryptContext on a bounded thread pool and records queueing time."""
+
+    def __init__(self, context: CryptContext, workers: int, max_pending: int):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        if self.pending >= self.workers + self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent sign-ins, please retry",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+        submitted = time.perf_counter()
+
+        def timed() -> Tuple[T, float, float]:
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        self.pending += 1
+        try:
+            result, queued, took = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        self.queue_seconds_total += queued
+        self.queue_seconds_max = max(self.queue_seconds_max, queued)
+        self.hash_seconds_total += took
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Check a password. The second item is a replacement hash when the stored
+        one uses outdated parameters (e.g. fewer bcrypt rounds), else None."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, float]:
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_ms_avg": round(self.queue_seconds_total / completed * 1000, 2),
+            "queue_ms_max": round(self.queue_seconds_max * 1000, 2),
+            "hash_ms_avg": round(self.hash_seconds_total / completed * 1000, 2),
+        }
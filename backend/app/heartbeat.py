@@ -0,0 +1,79 @@
+"""A timing wheel that visits every registered item once per period from one task.
+
+Items are spread over ``slots`` buckets and each tick handles one bucket, so
+checking thousands of connections costs one sleeping task and a steady
+trickle of work instead of a timer per connection or a burst per period.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=Hashable)
+
+
+class TimingWheel(Generic[T]):
+    def __init__(
+        self,
+        period: float,
+        slots: int,
+        visit: Callable[[T, float], None],
+        on_rotation: Optional[Callable[[float], None]] = None
+    ):
+        self.period = period
+        self.tick = period / slots
+        self._visit = visit
+        self._on_rotation = on_rotation
+        self._slots: List[Set[T]] = [set() for _ in range(slots)]
+        self._slot_of: Dict[T, int] = {}
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def add(self, item: T) -> None:
+        """Register an item; it is first visited about one period from now."""
+        if item in self._slot_of:
+            return
+        slot = (self._cursor - 1) % len(self._slots)
+        self._slots[slot].add(item)
+        self._slot_of[item] = slot
+
+    def discard(self, item: T) -> None:
+        slot = self._slot_of.pop(item, None)
+        if slot is not None:
+            self._slots[slot].discard(item)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick)
+            now = time.monotonic()
+            bucket = self._slots[self._cursor]
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            # Copied: visiting may discard items
+            for item in list(bucket):
+                try:
+                    self._visit(item, now)
+                except Exception as e:
+                    logger.error(f"Timing wheel visit failed: {e}")
+            if self._cursor == 0 and self._on_rotation is not None:
+                try:
+                    self._on_rotation(now)
+                except Exception as e:
+                    logger.error(f"Timing wheel rotation hook failed: {e}")
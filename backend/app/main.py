@@ -1,30 +1,57 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import logging
+import time
+from typing import Optional
 
 from .config import get_settings
-from .database import init_db
+from .database import async_session_maker, pool_stats
 from .websocket_manager import manager
+from .frames import Frame
+from .metrics import CONTENT_TYPE, Counter, Gauge, HTTPMetricsMiddleware, registry, ws_messages_received
 from .routers import boards, tasks, auth
-from .constants import WSEventTypes, WSMessageTypes
-from .auth import decode_token
+from .constants import BoardRoles, WSEventTypes, WSMessageTypes
+from .throttle import ALL_MESSAGES
+from .access import access_cache, get_board_role
+from .auth import decode_token, password_hasher, token_cache, user_cache
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Per-worker caches reported by /health and /metrics
+CACHES = {"token": token_cache, "user": user_cache, "access": access_cache}
+
+Counter(
+    "cache_lookups_total",
+    "Lookups in this worker's caches, by cache and result",
+    ("cache", "result"),
+    collect=lambda: [
+        ((name, result), getattr(cache, result)) for name, cache in CACHES.items() for result in ("hits", "misses")
+    ],
+)
+Gauge(
+    "cache_entries",
+    "Entries held in this worker's caches",
+    ("cache",),
+    collect=lambda: [((name,), len(cache)) for name, cache in CACHES.items()],
+)
+
 # Rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    # The schema is managed by Alembic (`alembic upgrade head`), not at startup
+    await manager.startup()
     yield
+    await manager.shutdown()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -64,6 +91,10 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
+# Request latency per route template; added last so it wraps all other middleware
+app.add_middleware(HTTPMetricsMiddleware)
+
+
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(boards.router, prefix="/api")
@@ -74,8 +105,14 @@ app.include_router(tasks.router, prefix="/api")
 async def websocket_endpoint(
     websocket: WebSocket,
     board_id: int,
-    token: str = Query(...)
+    token: str = Query(...),
+    since: Optional[int] = Query(None, ge=0),
+    epoch: Optional[str] = Query(None, max_length=32)
 ):
+    # Admission control comes first: during a reconnect storm, rejected clients cost no JWT decode
+    if not await manager.admit_handshake(websocket):
+        return
+
     # Validate JWT token
     payload = decode_token(token)
     if payload is None:
@@ -87,56 +124,64 @@ async def websocket_endpoint(
         await websocket.close(code=4001, reason="Invalid token payload")
         return
     
-    # TODO: Verify user has access to this board
-    # For now, we allow any authenticated user
+    try:
+        async with async_session_maker() as db:
+            role = await get_board_role(board_id, int(user_id), db)
+    except HTTPException:
+        role = BoardRoles.NONE
+    if role == BoardRoles.NONE:
+        await websocket.close(code=4403, reason="You don't have access to this board")
+        return
     
-    # Try to connect (checks connection limits)
-    connected = await manager.connect(websocket, board_id, user_id)
-    if not connected:
+    # Try to connect (checks connection limits, sends connection_established
+    # and, when resuming, the events missed since the last connection)
+    connection = await manager.connect(websocket, board_id, user_id, since=since, epoch=epoch)
+    if connection is None:
         return
     
     try:
-        # Send current active users to the new connection
-        await websocket.send_json({
-            "type": WSEventTypes.CONNECTION_ESTABLISHED,
-            "payload": {
-                "active_users": manager.get_active_users(board_id),
-                "cursors": manager.user_cursors.get(board_id, {})
-            }
-        })
-        
         while True:
-            data = await websocket.receive_text()
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            data = received.get("bytes")
+            if data is None:
+                data = received.get("text", "")
+            ws_messages_received.inc()
+            # Any message proves the client is alive, pongs included
+            connection.last_seen = time.monotonic()
+
+            # Overall limit, checked before any parsing so a flood costs next to nothing
+            if not manager.admit(connection, ALL_MESSAGES):
+                if connection.limiter.exceeded:
+                    await websocket.close(code=1008, reason="Message rate limit exceeded")
+                    raise WebSocketDisconnect(1008)
+                continue
             
             # Validate message
-            message = manager.validate_message(data)
+            message = manager.decode_message(data)
             if message is None:
-                await websocket.send_json({
-                    "type": WSEventTypes.ERROR,
-                    "payload": {"message": "Invalid message format"}
-                })
+                connection.enqueue(Frame(WSEventTypes.ERROR, {"message": "Invalid message format"}))
                 continue
             
-            # Handle cursor movements
+            # Handle cursor movements; over the limit only the latest position is kept,
+            # so these rejections lose nothing and do not count toward closing the socket
             if message.type == WSMessageTypes.CURSOR_MOVE:
-                await manager.broadcast_cursor(
-                    board_id, 
-                    user_id, 
-                    message.payload
-                )
+                cursor = message.payload.model_dump(exclude_none=True)
+                if connection.limiter.allow(message.type, tally=False):
+                    await manager.broadcast_cursor(board_id, user_id, cursor)
+                else:
+                    manager.defer_cursor(connection, cursor)
+            elif not manager.admit(connection, message.type):
+                continue
+            elif message.type == WSMessageTypes.PRESENCE_SYNC:
+                manager.send_presence(connection)
+            elif message.type == WSMessageTypes.PING:
+                connection.enqueue(Frame(WSEventTypes.PONG, {}))
             
     except WebSocketDisconnect:
+        # Announces user_left if this was the user's last connection to the board
         manager.disconnect(websocket, board_id, user_id)
-        await manager.broadcast(
-            board_id,
-            {
-                "type": WSEventTypes.USER_LEFT,
-                "payload": {
-                    "user_id": user_id,
-                    "active_users": manager.get_active_users(board_id)
-                }
-            }
-        )
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(websocket, board_id, user_id)
@@ -145,4 +190,17 @@ async def websocket_endpoint(
 @app.get("/health")
 @limiter.limit("10/minute")
 async def health_check(request: Request):
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "password_hashing": password_hasher.stats(),
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "access_cache": access_cache.stats(),
+        "database_pool": pool_stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Boolean, Table
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Boolean, Table, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 
 from .database import Base
+from .ordering import FIRST_KEY, MAX_KEY_LENGTH
 
 
 class TaskStatus(str, enum.Enum):
@@ -19,6 +20,8 @@ board_members = Table(
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
     Column("board_id", Integer, ForeignKey("boards.id"), primary_key=True),
+    # The primary key leads with user_id; this serves lookups of a board's members
+    Index("ix_board_members_board_id", "board_id"),
 )
 
 
@@ -50,7 +53,15 @@ class Board(Base):
 
     owner = relationship("User", back_populates="owned_boards")
     members = relationship("User", secondary=board_members, back_populates="member_boards")
-    tasks = relationship("Task", back_populates="board", cascade="all, delete-orphan")
+    tasks = relationship(
+        "Task", back_populates="board", cascade="all, delete-orphan", order_by="Task.position_key"
+    )
+
+    __table_args__ = (
+        Index("ix_boards_owner_id", "owner_id"),
+        # Keyset pagination of GET /api/boards (scanned backwards, newest first)
+        Index("ix_boards_created_at_id", "created_at", "id"),
+    )
 
 
 class Task(Base):
@@ -61,9 +72,36 @@ class Task(Base):
     description = Column(Text, nullable=True)
     status = Column(Enum(TaskStatus), default=TaskStatus.TODO)
     position = Column(Integer, default=0)
+    # Fractional ordering key (see ordering.py); compared byte-wise, hence the "C" collation
+    position_key = Column(
+        String(MAX_KEY_LENGTH).with_variant(String(MAX_KEY_LENGTH, collation="C"), "postgresql"),
+        nullable=False,
+        default=FIRST_KEY,
+        server_default=FIRST_KEY,
+    )
     board_id = Column(Integer, ForeignKey("boards.id"), nullable=False)
     assigned_to = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     board = relationship("Board", back_populates="tasks")
+
+    __table_args__ = (
+        Index("ix_tasks_board_status_position_key", "board_id", "status", "position_key"),
+        # Delta sync: tasks changed on a board since a watermark
+        Index("ix_tasks_board_updated_at", "board_id", "updated_at"),
+    )
+
+
+class TaskTombstone(Base):
+    """Record of a deleted task, so delta sync can report the deletion."""
+    __tablename__ = "task_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    board_id = Column(Integer, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_task_tombstones_board_deleted_at", "board_id", "deleted_at"),
+    )
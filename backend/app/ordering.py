@@ -0,0 +1,85 @@
+"""Fractional ordering keys for tasks.
+
+Keys are base-62 strings compared byte-wise. A key can always be generated
+between any two distinct keys, so moving a task rewrites only that task.
+Keys never end in "0", which guarantees there is room below every key.
+"""
+from typing import List, Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_INDEX = {digit: i for i, digit in enumerate(DIGITS)}
+
+# Key given to the first task in an empty column
+FIRST_KEY = DIGITS[BASE // 2]
+# Length of the tasks.position_key column
+MAX_KEY_LENGTH = 64
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """A key strictly between a and b, where "" is the lowest key and None is +infinity."""
+    if b is not None:
+        # Skip the shared prefix, padding a with zeros
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = _INDEX[a[0]] if a else 0
+    digit_b = _INDEX[b[0]] if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+
+    # Adjacent first digits
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _validate(key: str) -> None:
+    if not key or key.endswith("0") or any(ch not in _INDEX for ch in key):
+        raise ValueError(f"Invalid ordering key: {key!r}")
+
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """Return a key sorting after a and before b (either may be None for an open end)."""
+    if a is not None:
+        _validate(a)
+    if b is not None:
+        _validate(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"Ordering keys out of order: {a!r} >= {b!r}")
+
+    if a is None and b is None:
+        return FIRST_KEY
+
+    if b is None:
+        # Appending: bump the first digit that can grow so keys stay short
+        for i, digit in enumerate(a):
+            if digit != DIGITS[-1]:
+                return a[:i] + DIGITS[_INDEX[digit] + 1]
+        return a + FIRST_KEY
+
+    if a is None and _INDEX[b[0]] > 1:
+        # Prepending: step the first digit down
+        return DIGITS[_INDEX[b[0]] - 1]
+
+    return _midpoint(a or "", b)
+
+
+def evenly_spaced_keys(count: int) -> List[str]:
+    """``count`` short ascending keys spread evenly over the key space, for rebalancing."""
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    span = BASE ** width
+    keys = []
+    for i in range(1, count + 1):
+        value = i * span // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, rem = divmod(value, BASE)
+            digits.append(DIGITS[rem])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
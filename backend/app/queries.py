@@ -0,0 +1,76 @@
+"""Statements behind the hot read and write paths.
+
+The routers run these, and ``tests/test_query_plans.py`` EXPLAINs the same
+builders, so a query that changes here is the query whose plan is checked.
+"""
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import delete, exists, func, or_, select, tuple_, update
+
+from .access import board_access_filter
+from .models import Board, Task, TaskStatus, TaskTombstone, board_members
+
+
+def accessible_boards_statement(user_id: int, limit: int, after: Optional[Tuple[datetime, int]] = None):
+    """Boards the user owns, is a member of or can see as public, newest first, after a (created_at, id) key."""
+    is_member = exists().where(
+        board_members.c.board_id == Board.id,
+        board_members.c.user_id == user_id,
+    )
+    stmt = (
+        select(Board)
+        .where(or_(Board.owner_id == user_id, is_member, Board.is_public == True))
+        .order_by(Board.created_at.desc(), Board.id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(Board.created_at, Board.id) < tuple_(*after))
+    return stmt
+
+
+def task_counts_statement(board_ids: Sequence[int]):
+    """(board_id, status, count) rows."""
+    return (
+        select(Task.board_id, Task.status, func.count())
+        .where(Task.board_id.in_(board_ids))
+        .group_by(Task.board_id, Task.status)
+    )
+
+
+def board_tasks_statement(board_ids: Sequence[int]):
+    """Every task of the boards, by column and position."""
+    return select(Task).where(Task.board_id.in_(board_ids)).order_by(Task.status, Task.position_key)
+
+
+def column_tail_statement(board_id: int, task_status: TaskStatus):
+    """The last ordering key in a column, or NULL when it is empty."""
+    return select(func.max(Task.position_key)).where(Task.board_id == board_id, Task.status == task_status)
+
+
+def column_tails_statement(board_id: int):
+    """(status, last ordering key) for every non-empty column of a board."""
+    return select(Task.status, func.max(Task.position_key)).where(Task.board_id == board_id).group_by(Task.status)
+
+
+def changed_tasks_statement(board_id: int, since: datetime):
+    return select(Task).where(Task.board_id == board_id, Task.updated_at > since).order_by(Task.updated_at)
+
+
+def deleted_task_ids_statement(board_id: int, since: datetime):
+    return select(TaskTombstone.task_id).where(TaskTombstone.board_id == board_id, TaskTombstone.deleted_at > since)
+
+
+def guarded_task_update_statement(task_id: int, user_id: int, values: dict):
+    """Update a task the user can access and return it, in one statement (a plain read without values)."""
+    stmt = update(Task).values(**values).returning(Task) if values else select(Task)
+    return stmt.where(Task.id == task_id, board_access_filter(Task.board_id, user_id))
+
+
+def guarded_task_delete_statement(task_id: int, user_id: int):
+    """Delete a task the user can access, returning its board_id."""
+    return (
+        delete(Task)
+        .where(Task.id == task_id, board_access_filter(Task.board_id, user_id))
+        .returning(Task.board_id)
+    )
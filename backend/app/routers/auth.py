@@ -5,7 +5,7 @@ from sqlalchemy import select
 from ..database import get_db
 from ..models import User
 from ..schemas import UserCreate, UserLogin, UserResponse, Token
-from ..auth import get_password_hash, verify_password, create_access_token
+from ..auth import Principal, get_password_hash, verify_password, create_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -29,7 +29,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         )
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -53,7 +53,11 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == credentials.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_password(credentials.password, user.hashed_password)
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -66,6 +70,11 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
             detail="User account is disabled"
         )
     
+    # Hash parameters changed since this password was set: store the upgraded hash
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     access_token = create_access_token(data={"sub": str(user.id)})
     
     return Token(
@@ -77,6 +86,6 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(__import__('app.auth', fromlist=['get_current_user']).get_current_user)
+    current_user: Principal = Depends(__import__('app.auth', fromlist=['get_current_user']).get_current_user)
 ):
     return current_user
@@ -1,24 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import Optional, Tuple
+from datetime import datetime
+import base64
 
+from ..config import get_settings
 from ..database import get_db
-from ..models import Board, User
-from ..schemas import BoardCreate, BoardResponse, BoardUpdate
-from ..auth import get_current_user
+from ..models import Board, TaskStatus
+from ..schemas import BoardCreate, BoardResponse, BoardUpdate, BoardSummary, BoardPage, TaskResponse
+from ..auth import Principal, get_current_user
+from ..access import require_board_access
+from ..queries import accessible_boards_statement, board_tasks_statement, task_counts_statement
+from ..snapshots import board_snapshots, invalidate_board_snapshots
 
+settings = get_settings()
 router = APIRouter(prefix="/boards", tags=["boards"])
 
 
+def encode_cursor(board: Board) -> str:
+    raw = f"{board.created_at.isoformat()}|{board.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, board_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(board_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 async def get_board_with_access(
     board_id: int,
     db: AsyncSession,
-    user: User,
+    user: Principal,
     require_owner: bool = False
 ) -> Board:
     """Get board and verify user has access."""
+    await require_board_access(board_id, db, user, require_owner=require_owner)
+    return await load_board(board_id, db)
+
+
+async def load_board(board_id: int, db: AsyncSession) -> Board:
+    """Load a board with its tasks. Raises 404 if it does not exist."""
     result = await db.execute(
         select(Board).options(selectinload(Board.tasks)).where(Board.id == board_id)
     )
@@ -27,17 +53,6 @@ async def get_board_with_access(
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
     
-    # Check access
-    is_owner = board.owner_id == user.id
-    is_member = user in board.members
-    is_public = board.is_public
-    
-    if require_owner and not is_owner:
-        raise HTTPException(status_code=403, detail="Only board owner can perform this action")
-    
-    if not (is_owner or is_member or is_public):
-        raise HTTPException(status_code=403, detail="You don't have access to this board")
-    
     return board
 
 
@@ -45,43 +60,80 @@ async def get_board_with_access(
 async def create_board(
     board: BoardCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     db_board = Board(**board.model_dump(), owner_id=current_user.id)
     db.add(db_board)
     await db.commit()
-    await db.refresh(db_board)
+    await db.refresh(db_board, ["tasks"])
     return db_board
 
 
-@router.get("/", response_model=List[BoardResponse])
+@router.get("/", response_model=BoardPage)
 async def get_boards(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.board_page_size, ge=1, le=settings.board_page_size_max),
+    include_tasks: bool = False,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
+    """List accessible boards, newest first, with per-status task counts.
+
+    Pages are keyed on (created_at, id); pass ``next_cursor`` back as
+    ``cursor`` for the next page. Full task lists are only included when
+    ``include_tasks`` is set.
+    """
     # Get boards owned by user, member of, or public
-    result = await db.execute(
-        select(Board)
-        .options(selectinload(Board.tasks))
-        .where(
-            or_(
-                Board.owner_id == current_user.id,
-                Board.members.contains(current_user),
-                Board.is_public == True
-            )
+    query = accessible_boards_statement(current_user.id, limit + 1, decode_cursor(cursor) if cursor else None)
+
+    boards = list((await db.execute(query)).scalars().all())
+    next_cursor = encode_cursor(boards[limit - 1]) if len(boards) > limit else None
+    boards = boards[:limit]
+
+    items = {
+        board.id: BoardSummary(
+            id=board.id,
+            name=board.name,
+            description=board.description,
+            is_public=board.is_public,
+            owner_id=board.owner_id,
+            created_at=board.created_at,
+            updated_at=board.updated_at,
+            task_counts={task_status.value: 0 for task_status in TaskStatus},
         )
-        .order_by(Board.created_at.desc())
-    )
-    return result.scalars().all()
+        for board in boards
+    }
+    if not items:
+        return BoardPage(items=[], next_cursor=next_cursor)
+
+    counts = await db.execute(task_counts_statement(list(items)))
+    for board_id, task_status, count in counts:
+        items[board_id].task_counts[task_status.value] = count
+
+    if include_tasks:
+        for item in items.values():
+            item.tasks = []
+        tasks = await db.execute(board_tasks_statement(list(items)))
+        for task in tasks.scalars():
+            items[task.board_id].tasks.append(TaskResponse.model_validate(task))
+
+    return BoardPage(items=list(items.values()), next_cursor=next_cursor)
 
 
 @router.get("/{board_id}", response_model=BoardResponse)
 async def get_board(
     board_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    return await get_board_with_access(board_id, db, current_user)
+    await require_board_access(board_id, db, current_user)
+
+    async def build() -> bytes:
+        board = await load_board(board_id, db)
+        return BoardResponse.model_validate(board).model_dump_json().encode()
+
+    return await board_snapshots.respond(request, ("board", board_id), board_id, build)
 
 
 @router.patch("/{board_id}", response_model=BoardResponse)
@@ -89,7 +141,7 @@ async def update_board(
     board_id: int,
     board_update: BoardUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     board = await get_board_with_access(board_id, db, current_user, require_owner=True)
     
@@ -99,6 +151,7 @@ async def update_board(
     
     await db.commit()
     await db.refresh(board)
+    invalidate_board_snapshots(board_id)
     return board
 
 
@@ -106,8 +159,9 @@ async def update_board(
 async def delete_board(
     board_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     board = await get_board_with_access(board_id, db, current_user, require_owner=True)
     await db.delete(board)
     await db.commit()
+    invalidate_board_snapshots(board_id)
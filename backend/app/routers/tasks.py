@@ -1,114 +1,484 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
-from sqlalchemy.orm import selectinload
-from typing import List
-from datetime import datetime
-
-from ..database import get_db
-from ..models import Task, Board, User
-from ..schemas import TaskCreate, TaskUpdate, TaskResponse
+from sqlalchemy import select, insert, update, delete, case
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import base64
+import logging
+
+from ..config import get_settings
+from ..database import get_db, async_session_maker
+from ..models import Task, TaskStatus, TaskTombstone
+from ..queries import (
+    board_tasks_statement, changed_tasks_statement, column_tail_statement, column_tails_statement,
+    deleted_task_ids_statement, guarded_task_delete_statement, guarded_task_update_statement
+)
+from ..ordering import MAX_KEY_LENGTH, key_between, evenly_spaced_keys
+from ..schemas import (
+    TaskCreate, TaskUpdate, TaskResponse, TaskChanges, TaskBatchRequest, TaskBatchResponse,
+    TaskSearchHit, TaskSearchPage
+)
 from ..websocket_manager import manager
-from ..auth import get_current_user
+from ..frames import Frame
+from ..auth import Principal, get_current_user
+from ..access import require_board_access, board_access_filter
+from ..snapshots import board_snapshots, invalidate_board_snapshots
+from ..search import search_tasks as run_search, task_index
 from ..constants import WSEventTypes
 
+settings = get_settings()
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+task_list = TypeAdapter(List[TaskResponse])
+
+
+async def verify_board_access(board_id: int, db: AsyncSession, user: Principal) -> str:
+    """Verify user has access to the board. Returns the user's role on it."""
+    return await require_board_access(board_id, db, user)
+
+
+async def _raise_task_unavailable(task_id: int, db: AsyncSession, user: Principal):
+    """Work out why a guarded mutation matched no row: missing task or no access."""
+    board_id = await db.scalar(select(Task.board_id).where(Task.id == task_id))
+    if board_id is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    await verify_board_access(board_id, db, user)
+    raise HTTPException(status_code=404, detail="Task not found")
+
 
-async def verify_board_access(board_id: int, db: AsyncSession, user: User) -> Board:
-    """Verify user has access to the board."""
+async def _rebalance_column(board_id: int, task_status: TaskStatus):
+    """Respread ordering keys in one column once they have grown long. Order is unchanged."""
+    try:
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(Task.id)
+                .where(Task.board_id == board_id, Task.status == task_status)
+                .order_by(Task.position_key, Task.id)
+                .with_for_update()
+            )
+            ids = result.scalars().all()
+            keys = evenly_spaced_keys(len(ids))
+            await db.execute(update(Task), [{"id": i, "position_key": k} for i, k in zip(ids, keys)])
+            await db.commit()
+            result = await db.execute(select(Task).where(Task.id.in_(ids)))
+            respread = [TaskResponse.model_validate(task) for task in result.scalars()]
+        invalidate_board_snapshots(board_id)
+        # Clients place their next moves between the keys they hold: send them the new ones
+        response = TaskBatchResponse(created=[], updated=respread, deleted=[])
+        await manager.broadcast(board_id, Frame(WSEventTypes.TASKS_BATCH, response.model_dump()))
+    except Exception as e:
+        logger.error(f"Rebalancing board {board_id} column {task_status} failed: {e}")
+
+
+async def _respread_column_keys(
+    board_id: int,
+    task_status: TaskStatus,
+    changes: Dict[int, dict],
+    deletes: set,
+    db: AsyncSession
+):
+    """Give a column evenly spaced keys inside a batch, as its pending changes would order it.
+
+    The new keys are merged into ``changes``, to be written with the batch.
+    """
     result = await db.execute(
-        select(Board).options(selectinload(Board.members)).where(Board.id == board_id)
+        select(Task.id, Task.position_key, Task.status)
+        .where(
+            Task.board_id == board_id,
+            (Task.status == task_status) | Task.id.in_(changes.keys()),
+        )
+        .with_for_update()
     )
-    board = result.scalar_one_or_none()
-    
-    if not board:
-        raise HTTPException(status_code=404, detail="Board not found")
-    
-    is_owner = board.owner_id == user.id
-    is_member = user in board.members
-    is_public = board.is_public
-    
-    if not (is_owner or is_member or is_public):
-        raise HTTPException(status_code=403, detail="You don't have access to this board")
-    
-    return board
+    order = []
+    for task_id, key, current_status in result:
+        data = changes.get(task_id, {})
+        if task_id not in deletes and data.get("status", current_status) == task_status:
+            order.append((data.get("position_key", key), task_id))
+    order.sort()
+    for (_, task_id), key in zip(order, evenly_spaced_keys(len(order))):
+        changes.setdefault(task_id, {})["position_key"] = key
+
+
+async def _prune_tombstones(board_id: int):
+    """Forget deletions older than the retention window; clients that far behind get a full sync."""
+    horizon = datetime.utcnow() - timedelta(days=settings.task_tombstone_retention_days)
+    try:
+        async with async_session_maker() as db:
+            await db.execute(
+                delete(TaskTombstone)
+                .where(TaskTombstone.board_id == board_id, TaskTombstone.deleted_at < horizon)
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Pruning task tombstones of board {board_id} failed: {e}")
+
+
+async def _key_between_tasks(
+    task_id: int,
+    after_id: Optional[int],
+    before_id: Optional[int],
+    db: AsyncSession,
+    user: Principal
+) -> Tuple[str, bool]:
+    """Ordering key placing a task between two neighbours on its board.
+
+    Returns (key, needs_rebalance). Neighbours that collided on the same key
+    are resolved by placing after the first one and requesting a rebalance.
+    A missing or inaccessible task is reported as such (404/403) before any
+    neighbour error, so neighbour ids cannot be probed on other boards.
+    """
+    neighbour_ids = [i for i in (after_id, before_id) if i is not None]
+    board_id = (
+        select(Task.board_id)
+        .where(Task.id == task_id, board_access_filter(Task.board_id, user.id))
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(Task.id, Task.position_key).where(Task.id.in_(neighbour_ids), Task.board_id == board_id)
+    )
+    keys = dict(result.all())
+    if len(keys) != len(neighbour_ids):
+        if await db.scalar(select(board_id)) is None:
+            await _raise_task_unavailable(task_id, db, user)
+        raise HTTPException(status_code=400, detail="Neighbour task not found on this board")
+
+    after_key = keys.get(after_id)
+    before_key = keys.get(before_id)
+    if after_key is not None and before_key is not None and after_key >= before_key:
+        return key_between(after_key, None), True
+    key = key_between(after_key, before_key)
+    return key, len(key) > settings.position_key_rebalance_length
+
+
+async def _column_tail_key(
+    task_id: int,
+    task_status: TaskStatus,
+    db: AsyncSession,
+    user: Principal
+) -> Tuple[str, bool]:
+    """Ordering key appending a task to a column of its board. Returns (key, needs_rebalance)."""
+    board_id = (
+        select(Task.board_id)
+        .where(Task.id == task_id, board_access_filter(Task.board_id, user.id))
+        .scalar_subquery()
+    )
+    last_key = await db.scalar(
+        column_tail_statement(board_id, task_status)
+    )
+    key = key_between(last_key, None)
+    return key, len(key) > settings.position_key_rebalance_length
+
+
+def encode_search_cursor(rank: float, task_id: int) -> str:
+    raw = f"{rank!r}|{task_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return float(rank), int(task_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _task_event(event_type: str, db_task: Task) -> Frame:
+    """Build the broadcast frame for a task once; it is encoded once for all viewers."""
+    return Frame(event_type, TaskResponse.model_validate(db_task).model_dump())
 
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 async def create_task(
     task: TaskCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     await verify_board_access(task.board_id, db, current_user)
     
-    db_task = Task(**task.model_dump())
+    # Append to the end of its column
+    last_key = await db.scalar(column_tail_statement(task.board_id, task.status))
+    position_key = key_between(last_key, None)
+    if len(position_key) > settings.position_key_rebalance_length:
+        background_tasks.add_task(_rebalance_column, task.board_id, task.status)
+    
+    db_task = Task(**task.model_dump(), position_key=position_key)
     db.add(db_task)
     await db.commit()
     await db.refresh(db_task)
+    invalidate_board_snapshots(task.board_id)
+    task_index.upsert([db_task])
     
     # Broadcast to all connected clients
-    await manager.broadcast(
-        task.board_id,
-        {
-            "type": WSEventTypes.TASK_CREATED,
-            "payload": TaskResponse.model_validate(db_task).model_dump(mode="json"),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    )
+    await manager.broadcast(task.board_id, _task_event(WSEventTypes.TASK_CREATED, db_task))
     
     return db_task
 
 
+@router.post("/batch", response_model=TaskBatchResponse)
+async def batch_tasks(
+    batch: TaskBatchRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Apply many task operations atomically and broadcast one tasks_batch event.
+
+    Operations are grouped by kind: creates, then updates/moves in request
+    order, then deletes. Every referenced task must belong to ``board_id``.
+    """
+    board_id = batch.board_id
+    await verify_board_access(board_id, db, current_user)
+    
+    creates = [op for op in batch.operations if op.op == "create"]
+    updates = [op for op in batch.operations if op.op in ("update", "move")]
+    deletes = {op.id for op in batch.operations if op.op == "delete"}
+    
+    # One read validates every referenced task and fetches its ordering key
+    referenced = {op.id for op in updates} | deletes
+    referenced |= {i for op in updates for i in (op.after_id, op.before_id) if i is not None}
+    keys: Dict[int, str] = {}
+    statuses: Dict[int, TaskStatus] = {}
+    if referenced:
+        result = await db.execute(
+            select(Task.id, Task.position_key, Task.status)
+            .where(Task.id.in_(referenced), Task.board_id == board_id)
+        )
+        rows = result.all()
+        keys = {task_id: key for task_id, key, _ in rows}
+        statuses = {task_id: task_status for task_id, _, task_status in rows}
+        missing = referenced - keys.keys()
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Tasks not found on this board: {sorted(missing)}")
+    
+    collided = set()
+    created: List[Task] = []
+    # Creates, and status changes without a placement, go to the end of their column
+    last_keys: Dict[TaskStatus, str] = {}
+    if creates or any(
+        op.status is not None and op.after_id is None and op.before_id is None for op in updates
+    ):
+        result = await db.execute(column_tails_statement(board_id))
+        last_keys = dict(result.all())
+    if creates:
+        rows = []
+        for op in creates:
+            data = op.model_dump(exclude={"op"})
+            column = TaskStatus(data["status"])
+            last_keys[column] = key_between(last_keys.get(column), None)
+            rows.append({**data, "board_id": board_id, "position_key": last_keys[column]})
+        created = list(await db.scalars(insert(Task).returning(Task), rows))
+    
+    changes: Dict[int, dict] = {}
+    for op in updates:
+        if op.id in deletes:
+            continue
+        data = op.model_dump(exclude_unset=True, exclude={"op", "id", "after_id", "before_id"})
+        if op.after_id is not None or op.before_id is not None:
+            after_key = keys.get(op.after_id)
+            before_key = keys.get(op.before_id)
+            if after_key is not None and before_key is not None and after_key >= before_key:
+                data["position_key"] = key_between(after_key, None)
+                collided.add(op.id)
+            else:
+                data["position_key"] = key_between(after_key, before_key)
+            keys[op.id] = data["position_key"]
+        elif data.get("status") is not None:
+            current = changes.get(op.id, {}).get("status", statuses[op.id])
+            if data["status"] != current:
+                column = TaskStatus(data["status"])
+                last_keys[column] = key_between(last_keys.get(column), None)
+                data["position_key"] = keys[op.id] = last_keys[column]
+        changes.setdefault(op.id, {}).update(data)
+    
+    # Many placements chained after one another can outgrow the key column;
+    # respread those columns now rather than fail the whole batch
+    overlong = {
+        changes[task_id].get("status", statuses.get(task_id))
+        for task_id, key in keys.items()
+        if task_id in changes and len(key) > MAX_KEY_LENGTH
+    }
+    for column in overlong:
+        await _respread_column_keys(board_id, column, changes, deletes, db)
+    
+    updated: List[Task] = []
+    rows = [{"id": task_id, **data} for task_id, data in changes.items() if data]
+    if rows:
+        await db.execute(update(Task), rows)
+        result = await db.execute(
+            select(Task)
+            .where(Task.id.in_([row["id"] for row in rows]))
+            .execution_options(populate_existing=True)
+        )
+        # Created tasks whose keys were respread are reported as created only
+        created_ids = {task.id for task in created}
+        updated = [task for task in result.scalars() if task.id not in created_ids]
+    
+    if deletes:
+        await db.execute(
+            delete(Task)
+            .where(Task.id.in_(deletes), Task.board_id == board_id)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            insert(TaskTombstone),
+            [{"task_id": task_id, "board_id": board_id} for task_id in deletes]
+        )
+        background_tasks.add_task(_prune_tombstones, board_id)
+    
+    await db.commit()
+    invalidate_board_snapshots(board_id)
+    task_index.upsert(created + updated)
+    if deletes:
+        task_index.discard(board_id, deletes)
+    
+    for column in {
+        task.status for task in created + updated
+        if task.id in collided or len(task.position_key) > settings.position_key_rebalance_length
+    }:
+        background_tasks.add_task(_rebalance_column, board_id, column)
+    
+    response = TaskBatchResponse(
+        created=[TaskResponse.model_validate(task) for task in created],
+        updated=[TaskResponse.model_validate(task) for task in updated],
+        deleted=sorted(deletes),
+    )
+    await manager.broadcast(board_id, Frame(WSEventTypes.TASKS_BATCH, response.model_dump()))
+    
+    return response
+
+
+@router.get("/search", response_model=TaskSearchPage)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to match in titles and descriptions"),
+    board_id: Optional[int] = None,
+    task_status: Optional[TaskStatus] = Query(None, alias="status"),
+    assigned_to: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.task_search_page_size, ge=1, le=settings.task_search_page_size_max),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Tasks matching ``q`` on one board, or on every accessible board, best match first.
+
+    Pages are keyed on (rank, id); pass ``next_cursor`` back as ``cursor``
+    for the next page.
+    """
+    if board_id is not None:
+        await verify_board_access(board_id, db, current_user)
+    
+    after = decode_search_cursor(cursor) if cursor else None
+    hits, partial = await run_search(
+        q, current_user.id, db,
+        board_id=board_id, status=task_status, assigned_to=assigned_to, limit=limit + 1, after=after,
+    )
+    next_cursor = None
+    if len(hits) > limit:
+        task, rank = hits[limit - 1]
+        next_cursor = encode_search_cursor(rank, task.id)
+    items = [
+        TaskSearchHit(**TaskResponse.model_validate(task).model_dump(), rank=rank)
+        for task, rank in hits[:limit]
+    ]
+    return TaskSearchPage(items=items, next_cursor=next_cursor, partial=partial)
+
+
 @router.get("/board/{board_id}", response_model=List[TaskResponse])
 async def get_tasks_by_board(
     board_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     await verify_board_access(board_id, db, current_user)
     
-    result = await db.execute(
-        select(Task).where(Task.board_id == board_id).order_by(Task.position)
-    )
-    return result.scalars().all()
+    async def build() -> bytes:
+        result = await db.execute(board_tasks_statement([board_id]))
+        return task_list.dump_json(task_list.validate_python(result.scalars().all(), from_attributes=True))
+    
+    return await board_snapshots.respond(request, ("tasks", board_id), board_id, build)
+
+
+@router.get("/board/{board_id}/changes", response_model=TaskChanges)
+async def get_task_changes(
+    board_id: int,
+    since: Optional[datetime] = Query(None, description="Watermark returned by the previous call"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Tasks created or updated, and ids deleted, since a watermark.
+
+    Pass the returned ``watermark`` as ``since`` on the next call. Changes in
+    the overlap window before it are returned again, so applying them must be
+    idempotent. Without ``since``, or when it is older than tombstones are
+    kept, the whole board is returned with ``full`` set.
+    """
+    await verify_board_access(board_id, db, current_user)
+    
+    watermark = datetime.utcnow()
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    horizon = watermark - timedelta(days=settings.task_tombstone_retention_days)
+    if since is None or since < horizon:
+        result = await db.execute(board_tasks_statement([board_id]))
+        return TaskChanges(tasks=result.scalars().all(), deleted=[], watermark=watermark, full=True)
+    
+    since -= timedelta(seconds=settings.task_sync_overlap_seconds)
+    result = await db.execute(changed_tasks_statement(board_id, since))
+    tasks = result.scalars().all()
+    result = await db.execute(deleted_task_ids_statement(board_id, since))
+    return TaskChanges(tasks=tasks, deleted=result.scalars().all(), watermark=watermark)
 
 
 @router.patch("/{task_id}", response_model=TaskResponse)
 async def update_task(
     task_id: int, 
     task_update: TaskUpdate, 
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    result = await db.execute(select(Task).where(Task.id == task_id))
-    db_task = result.scalar_one_or_none()
-    
-    if not db_task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    update_data = task_update.model_dump(exclude_unset=True)
+    after_id = update_data.pop("after_id", None)
+    before_id = update_data.pop("before_id", None)
     
-    await verify_board_access(db_task.board_id, db, current_user)
+    needs_rebalance = False
+    if after_id is not None or before_id is not None:
+        update_data["position_key"], needs_rebalance = await _key_between_tasks(
+            task_id, after_id, before_id, db, current_user
+        )
+    elif update_data.get("status") is not None:
+        # Moved to another column without a placement: append, as create_task does
+        tail_key, needs_rebalance = await _column_tail_key(task_id, update_data["status"], db, current_user)
+        update_data["position_key"] = case(
+            (Task.status != update_data["status"], tail_key), else_=Task.position_key
+        )
     
-    update_data = task_update.model_dump(exclude_unset=True)
+    # Access check, update and payload in one statement
+    result = await db.execute(
+        guarded_task_update_statement(task_id, current_user.id, update_data)
+        .execution_options(synchronize_session=False)
+    )
+    db_task = result.scalar_one_or_none()
     
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
+    if not db_task:
+        await _raise_task_unavailable(task_id, db, current_user)
     
     await db.commit()
-    await db.refresh(db_task)
+    invalidate_board_snapshots(db_task.board_id)
+    task_index.upsert([db_task])
+    
+    if needs_rebalance:
+        background_tasks.add_task(_rebalance_column, db_task.board_id, db_task.status)
     
     # Determine event type
-    event_type = WSEventTypes.TASK_MOVED if "status" in update_data else WSEventTypes.TASK_UPDATED
-    
-    await manager.broadcast(
-        db_task.board_id,
-        {
-            "type": event_type,
-            "payload": TaskResponse.model_validate(db_task).model_dump(mode="json"),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    )
+    moved = "status" in update_data or "position_key" in update_data
+    event_type = WSEventTypes.TASK_MOVED if moved else WSEventTypes.TASK_UPDATED
+    
+    await manager.broadcast(db_task.board_id, _task_event(event_type, db_task))
     
     return db_task
 
@@ -116,27 +486,22 @@ async def update_task(
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     task_id: int,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    result = await db.execute(select(Task).where(Task.id == task_id))
-    db_task = result.scalar_one_or_none()
-    
-    if not db_task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    await verify_board_access(db_task.board_id, db, current_user)
+    result = await db.execute(
+        guarded_task_delete_statement(task_id, current_user.id).execution_options(synchronize_session=False)
+    )
+    board_id = result.scalar_one_or_none()
     
-    board_id = db_task.board_id
+    if board_id is None:
+        await _raise_task_unavailable(task_id, db, current_user)
     
-    await db.delete(db_task)
+    await db.execute(insert(TaskTombstone).values(task_id=task_id, board_id=board_id))
     await db.commit()
+    invalidate_board_snapshots(board_id)
+    task_index.discard(board_id, [task_id])
+    background_tasks.add_task(_prune_tombstones, board_id)
     
-    await manager.broadcast(
-        board_id,
-        {
-            "type": WSEventTypes.TASK_DELETED,
-            "payload": {"id": task_id},
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    )
+    await manager.broadcast(board_id, Frame(WSEventTypes.TASK_DELETED, {"id": task_id}))
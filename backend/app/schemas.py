@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Annotated, Dict, Optional, List, Literal, Union
 from enum import Enum
 
 
@@ -51,21 +51,24 @@ class TaskBase(BaseModel):
 
 class TaskCreate(TaskBase):
     board_id: int
-    position: Optional[int] = 0
 
 
 class TaskUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=255)
     description: Optional[str] = Field(None, max_length=5000)
     status: Optional[TaskStatus] = None
-    position: Optional[int] = None
     assigned_to: Optional[str] = Field(None, max_length=255)
+    # Reorder: place the task between these neighbours (either may be omitted)
+    after_id: Optional[int] = None
+    before_id: Optional[int] = None
 
 
 class TaskResponse(TaskBase):
     id: int
     board_id: int
+    # Deprecated and no longer written: ordering is position_key. Kept for older clients
     position: int
+    position_key: str
     created_at: datetime
     updated_at: datetime
 
@@ -73,6 +76,57 @@ class TaskResponse(TaskBase):
         from_attributes = True
 
 
+class TaskChanges(BaseModel):
+    """Tasks changed since a watermark. With ``full`` set, ``tasks`` is the whole board."""
+    tasks: List[TaskResponse]
+    deleted: List[int]
+    watermark: datetime
+    full: bool = False
+
+
+class TaskSearchHit(TaskResponse):
+    rank: float
+
+
+class TaskSearchPage(BaseModel):
+    items: List[TaskSearchHit]
+    next_cursor: Optional[str] = None
+    # Set when only some of the accessible boards were searched (in-process index; pass board_id)
+    partial: bool = False
+
+
+# Batch Task Schemas
+class TaskBatchCreate(TaskBase):
+    op: Literal["create"]
+
+
+class TaskBatchUpdate(TaskUpdate):
+    op: Literal["update", "move"]
+    id: int
+
+
+class TaskBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+TaskBatchOperation = Annotated[
+    Union[TaskBatchCreate, TaskBatchUpdate, TaskBatchDelete],
+    Field(discriminator="op"),
+]
+
+
+class TaskBatchRequest(BaseModel):
+    board_id: int
+    operations: List[TaskBatchOperation] = Field(..., min_length=1, max_length=500)
+
+
+class TaskBatchResponse(BaseModel):
+    created: List[TaskResponse] = []
+    updated: List[TaskResponse] = []
+    deleted: List[int] = []
+
+
 # Board Schemas
 class BoardBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
@@ -101,6 +155,23 @@ class BoardResponse(BoardBase):
         from_attributes = True
 
 
+class BoardSummary(BoardBase):
+    id: int
+    owner_id: int
+    created_at: datetime
+    updated_at: datetime
+    task_counts: Dict[str, int] = {}
+    tasks: Optional[List[TaskResponse]] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BoardPage(BaseModel):
+    items: List[BoardSummary]
+    next_cursor: Optional[str] = None
+
+
 # WebSocket Event Schemas
 class WSEventType(str, Enum):
     TASK_CREATED = "task_created"
@@ -112,9 +183,37 @@ class WSEventType(str, Enum):
     CURSOR_MOVE = "cursor_move"
 
 
-class WSMessage(BaseModel):
-    type: str
-    payload: dict = {}
+# Inbound WebSocket messages, discriminated on "type"
+class CursorPayload(BaseModel):
+    x: float
+    y: float
+    taskId: Optional[int] = None
+
+
+class CursorMoveMessage(BaseModel):
+    type: Literal["cursor_move"]
+    payload: CursorPayload
+
+
+class PingMessage(BaseModel):
+    type: Literal["ping"]
+    payload: Dict[str, str] = {}
+
+
+class PongMessage(BaseModel):
+    type: Literal["pong"]
+    payload: Dict[str, str] = {}
+
+
+class PresenceSyncMessage(BaseModel):
+    type: Literal["presence_sync"]
+    payload: Dict[str, str] = {}
+
+
+InboundWSMessage = Annotated[
+    Union[CursorMoveMessage, PingMessage, PongMessage, PresenceSyncMessage],
+    Field(discriminator="type"),
+]
 
 
 class WSEvent(BaseModel):
@@ -0,0 +1,351 @@
+"""Ranked text search over task titles and descriptions.
+
+``GET /api/tasks/search`` is answered by one of two backends:
+
+* ``postgres``: ``tasks.search_vector`` (migration 0004) is a generated
+  tsvector of the title (weight A) and description (weight B), so Postgres
+  keeps it current on every write, and a GIN index serves the match.
+  Queries go through ``websearch_to_tsquery`` (quoted phrases, ``or``,
+  ``-word``) and are ranked with ``ts_rank``.
+* ``memory``: an in-process inverted index, for databases without Postgres
+  full-text search (SQLite scratch databases). A board is loaded on its
+  first search and then updated in place by the task mutation handlers
+  through ``task_index``; other workers drop their copy and reload it on
+  their next search. Every query word must match; there is no stemming or
+  query syntax.
+
+Both rank title matches above description matches and page on (rank, id).
+"""
+import logging
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import exists, func, literal_column, or_, select, text, tuple_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .access import board_access_filter
+from .cache import TTLCache
+from .config import get_settings
+from .database import engine
+from .models import Board, Task, TaskStatus, board_members
+from .websocket_manager import manager
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SEARCH_SCOPE = "search"
+
+# Text search configuration tasks.search_vector is built with (migration 0004)
+SEARCH_CONFIG = "english"
+search_vector = literal_column("tasks.search_vector", TSVECTOR)
+_search_config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+# ts_rank's default weights for A (title) and B (description) terms
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+_WORD = re.compile(r"\w+")
+# The most common words of Postgres' english stop list, so both backends
+# ignore roughly the same words
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its me my no not of on "
+    "or our she so than that the their them then there these they this to was we were what when which "
+    "who will with you your".split()
+)
+
+# (rank, task id)
+Hit = Tuple[float, int]
+
+
+# Resolved by resolve_backend(); "auto" on Postgres stays unresolved until the first search
+_backend: Optional[str] = None
+
+
+def search_backend() -> Optional[str]:
+    """The backend in use, or None while "auto" on Postgres has not been checked yet."""
+    if settings.task_search_backend != "auto":
+        return settings.task_search_backend
+    if engine.dialect.name != "postgresql":
+        return "memory"
+    return _backend
+
+
+async def resolve_backend(db: AsyncSession) -> str:
+    """Settle "auto" on Postgres, once: full-text search only if migration 0004 added the column.
+
+    Databases built with ``init_db()`` (create_all) do not have it.
+    """
+    global _backend
+    backend = search_backend()
+    if backend is None:
+        has_column = await db.scalar(text(
+            "SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema()"
+            " AND table_name = 'tasks' AND column_name = 'search_vector')"
+        ))
+        backend = _backend = "postgres" if has_column else "memory"
+        if backend == "memory":
+            logger.warning("tasks.search_vector is missing (run alembic upgrade head); using the in-process index")
+    return backend
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+class BoardIndex:
+    """Inverted index of one board's tasks."""
+
+    __slots__ = ("postings", "docs")
+
+    def __init__(self):
+        # word -> task id -> weighted occurrences (title words count more)
+        self.postings: Dict[str, Dict[int, float]] = {}
+        # task id -> (words, status, assigned_to); words are needed to remove the task
+        self.docs: Dict[int, Tuple[Tuple[str, ...], TaskStatus, Optional[str]]] = {}
+
+    def add(
+        self,
+        task_id: int,
+        title: str,
+        description: Optional[str],
+        status: TaskStatus,
+        assigned_to: Optional[str]
+    ) -> None:
+        self.remove(task_id)
+        weights: Dict[str, float] = {}
+        for word in tokenize(title):
+            weights[word] = weights.get(word, 0.0) + TITLE_WEIGHT
+        for word in tokenize(description):
+            weights[word] = weights.get(word, 0.0) + DESCRIPTION_WEIGHT
+        for word, weight in weights.items():
+            self.postings.setdefault(word, {})[task_id] = weight
+        self.docs[task_id] = (tuple(weights), status, assigned_to)
+
+    def remove(self, task_id: int) -> None:
+        doc = self.docs.pop(task_id, None)
+        if doc is None:
+            return
+        for word in doc[0]:
+            postings = self.postings[word]
+            del postings[task_id]
+            if not postings:
+                del self.postings[word]
+
+    def search(
+        self,
+        words: Sequence[str],
+        status: Optional[TaskStatus],
+        assigned_to: Optional[str]
+    ) -> Iterator[Hit]:
+        """Tasks containing every word, scored by weighted occurrences times inverse document frequency."""
+        postings = [self.postings.get(word) for word in words]
+        if not postings or not all(postings):
+            return
+        # Walk the rarest word's postings and probe the others
+        postings.sort(key=len)
+        total = len(self.docs)
+        idf = [math.log(1 + total / len(p)) for p in postings]
+        for task_id in postings[0]:
+            if any(task_id not in p for p in postings[1:]):
+                continue
+            _, task_status, assignee = self.docs[task_id]
+            if status is not None and task_status != status:
+                continue
+            if assigned_to is not None and assignee != assigned_to:
+                continue
+            yield sum(p[task_id] * w for p, w in zip(postings, idf)), task_id
+
+
+class TaskSearchIndex:
+    """The ``memory`` backend: per-board indexes, loaded on demand and kept current by mutations.
+
+    As in ``SnapshotCache``, every change stamps the board with a new
+    generation, and an index loaded from the database is only kept if its
+    board's generation did not move during the load, so a load that raced a
+    commit cannot install the old text.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.boards = TTLCache(maxsize, ttl)
+        self._generations = TTLCache(maxsize, ttl)
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        # Until "auto" is resolved, peers may already be using the memory backend
+        return search_backend() != "postgres"
+
+    def _touch(self, board_id: int) -> None:
+        self._generation += 1
+        self._generations.set(board_id, self._generation)
+
+    def drop(self, board_id: int) -> None:
+        """Forget a board; it is reloaded on its next search."""
+        self._touch(board_id)
+        self.boards.pop(board_id)
+
+    def upsert(self, tasks: Iterable[Task]) -> None:
+        """Index created or updated tasks. Call after committing."""
+        if not self.enabled:
+            return
+        changed = set()
+        for task in tasks:
+            self._touch(task.board_id)
+            changed.add(task.board_id)
+            index: Optional[BoardIndex] = self.boards.get(task.board_id)
+            if index is not None:
+                index.add(task.id, task.title, task.description, task.status, task.assigned_to)
+        for board_id in changed:
+            self._notify_peers(board_id)
+
+    def discard(self, board_id: int, task_ids: Iterable[int]) -> None:
+        """Remove deleted tasks. Call after committing."""
+        if not self.enabled:
+            return
+        self._touch(board_id)
+        index: Optional[BoardIndex] = self.boards.get(board_id)
+        if index is not None:
+            for task_id in task_ids:
+                index.remove(task_id)
+        self._notify_peers(board_id)
+
+    def _notify_peers(self, board_id: int) -> None:
+        # This worker's copy is already current; peers reload theirs
+        manager.invalidate_board(board_id, scope=SEARCH_SCOPE, local=False)
+
+    async def _load(self, board_ids: Sequence[int], db: AsyncSession) -> Dict[int, BoardIndex]:
+        indexes: Dict[int, BoardIndex] = {}
+        missing = []
+        for board_id in board_ids:
+            index = self.boards.get(board_id)
+            if index is None:
+                missing.append(board_id)
+            else:
+                indexes[board_id] = index
+        if not missing:
+            return indexes
+
+        generations = {board_id: self._generations.get(board_id, 0) for board_id in missing}
+        loaded = {board_id: BoardIndex() for board_id in missing}
+        result = await db.execute(
+            select(Task.id, Task.board_id, Task.title, Task.description, Task.status, Task.assigned_to)
+            .where(Task.board_id.in_(missing))
+        )
+        for task_id, board_id, title, description, task_status, assigned_to in result:
+            loaded[board_id].add(task_id, title, description, task_status, assigned_to)
+        for board_id, index in loaded.items():
+            if self._generations.get(board_id, 0) == generations[board_id]:
+                self.boards.set(board_id, index)
+        indexes.update(loaded)
+        return indexes
+
+    async def search(
+        self,
+        q: str,
+        board_ids: Sequence[int],
+        status: Optional[TaskStatus],
+        assigned_to: Optional[str],
+        db: AsyncSession
+    ) -> List[Hit]:
+        """Every match on the given boards, best first."""
+        words = list(dict.fromkeys(tokenize(q)))
+        if not words or not board_ids:
+            return []
+        indexes = await self._load(board_ids, db)
+        hits = [hit for index in indexes.values() for hit in index.search(words, status, assigned_to)]
+        hits.sort(reverse=True)
+        return hits
+
+
+task_index = TaskSearchIndex(settings.task_search_index_boards, settings.task_search_index_ttl_seconds)
+manager.add_invalidation_hook(task_index.drop, scope=SEARCH_SCOPE)
+
+
+async def search_tasks(
+    q: str,
+    user_id: int,
+    db: AsyncSession,
+    board_id: Optional[int] = None,
+    status: Optional[TaskStatus] = None,
+    assigned_to: Optional[str] = None,
+    limit: int = 20,
+    after: Optional[Hit] = None
+) -> Tuple[List[Tuple[Task, float]], bool]:
+    """Up to ``limit`` matching tasks with their rank, best first, after the ``after`` (rank, id) key.
+
+    Searches ``board_id`` (the caller checks access to it) or every board
+    the user can access. Returns the hits and whether only part of those
+    boards was searched.
+    """
+    if await resolve_backend(db) == "postgres":
+        stmt = fts_statement(q, user_id, board_id, status, assigned_to, limit, after)
+        return [(task, float(task_rank)) for task, task_rank in (await db.execute(stmt)).all()], False
+
+    partial = False
+    if board_id is not None:
+        board_ids = [board_id]
+    else:
+        # Each board searched is loaded into memory: only the user's own and member
+        # boards are searched, newest first and at most a few of them
+        cap = settings.task_search_memory_max_boards
+        board_ids = list((await db.execute(_member_board_ids(user_id).limit(cap + 1))).scalars())
+        partial = len(board_ids) > cap
+        board_ids = board_ids[:cap]
+    hits = await task_index.search(q, board_ids, status, assigned_to, db)
+    if after is not None:
+        hits = [hit for hit in hits if hit < after]
+    hits = hits[:limit]
+    tasks = {
+        task.id: task
+        for task in (await db.execute(select(Task).where(Task.id.in_([task_id for _, task_id in hits])))).scalars()
+    }
+    # A task deleted by another worker since the index was loaded is skipped
+    return [(tasks[task_id], rank) for rank, task_id in hits if task_id in tasks], partial
+
+
+def fts_statement(
+    q: str,
+    user_id: int,
+    board_id: Optional[int] = None,
+    status: Optional[TaskStatus] = None,
+    assigned_to: Optional[str] = None,
+    limit: int = 20,
+    after: Optional[Hit] = None
+):
+    """The ``postgres`` backend's query: (Task, rank) rows, matched through the GIN index."""
+    query = func.websearch_to_tsquery(_search_config, q)
+    rank = func.ts_rank(search_vector, query)
+    stmt = (
+        select(Task, rank)
+        .where(search_vector.op("@@")(query))
+        .order_by(rank.desc(), Task.id.desc())
+        .limit(limit)
+    )
+    if board_id is not None:
+        stmt = stmt.where(Task.board_id == board_id)
+    else:
+        stmt = stmt.where(board_access_filter(Task.board_id, user_id))
+    if status is not None:
+        stmt = stmt.where(Task.status == status)
+    if assigned_to is not None:
+        stmt = stmt.where(Task.assigned_to == assigned_to)
+    if after is not None:
+        stmt = stmt.where(tuple_(rank, Task.id) < tuple_(*after))
+    return stmt
+
+
+def _member_board_ids(user_id: int):
+    """Boards the user owns or is a member of (public ones are only searched by board_id), newest first."""
+    is_member = exists().where(
+        board_members.c.board_id == Board.id,
+        board_members.c.user_id == user_id,
+    )
+    return (
+        select(Board.id)
+        .where(or_(Board.owner_id == user_id, is_member))
+        .order_by(Board.created_at.desc(), Board.id.desc())
+    )
@@ -0,0 +1,81 @@
+"""Run the API under uvicorn with tuned WebSocket compression and a graceful drain.
+
+uvicorn only switches permessage-deflate on or off; this entry point also
+applies the zlib level, memory level, window size and context takeover from
+settings, so large deployments can trade compression ratio for CPU and
+memory per connection. On shutdown it drains WebSocket connections over
+``ws_drain_seconds`` before uvicorn closes whatever is left:
+
+    python -m app.server --host 0.0.0.0 --port 8000 --workers 4
+"""
+import argparse
+
+import uvicorn
+from uvicorn.supervisors import ChangeReload, Multiprocess
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+
+from .config import get_settings
+
+settings = get_settings()
+
+
+def deflate_factory() -> ServerPerMessageDeflateFactory:
+    return ServerPerMessageDeflateFactory(
+        server_no_context_takeover=not settings.ws_deflate_context_takeover,
+        server_max_window_bits=settings.ws_deflate_max_window_bits,
+        compress_settings={"level": settings.ws_deflate_level, "memLevel": settings.ws_deflate_mem_level},
+    )
+
+
+class TunedWebSocketProtocol(WebSocketProtocol):
+    """uvicorn's websockets protocol with permessage-deflate configured from settings."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.available_extensions = [deflate_factory()] if settings.ws_per_message_deflate else []
+
+
+class DrainingServer(uvicorn.Server):
+    """A uvicorn server that closes WebSocket connections gradually before shutting down."""
+
+    async def shutdown(self, sockets=None):
+        # Imported here so supervisor processes never build the app's singletons
+        from .websocket_manager import manager
+
+        if not self.force_exit:
+            await manager.drain()
+        await super().shutdown(sockets=sockets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the collaboration API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--reload", action="store_true")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        reload=args.reload,
+        log_level=args.log_level,
+        ws=TunedWebSocketProtocol,
+        ws_per_message_deflate=settings.ws_per_message_deflate,
+    )
+    server = DrainingServer(config)
+    # As uvicorn.run(), but with our server class in every worker
+    if config.should_reload:
+        ChangeReload(config, target=server.run, sockets=[config.bind_socket()]).run()
+    elif config.workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
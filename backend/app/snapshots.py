@@ -0,0 +1,83 @@
+"""Serialized snapshots of board reads, served with a strong ETag.
+
+``GET /api/boards/{id}`` and ``GET /api/tasks/board/{id}`` keep their JSON
+body per board, so repeated reads of an unchanged board skip the database
+and serialization, and a matching ``If-None-Match`` gets a bodyless 304.
+Every task or board mutation must call ``invalidate_board_snapshots`` after
+committing; the invalidation reaches all workers through the backplane.
+"""
+import hashlib
+from typing import Awaitable, Callable, Hashable, Optional
+
+from fastapi import Request, Response
+
+from .cache import TTLCache
+from .config import get_settings
+from .websocket_manager import manager
+
+settings = get_settings()
+
+SNAPSHOT_SCOPE = "snapshot"
+
+
+class Snapshot:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class SnapshotCache:
+    """Per-board response bodies, with a guard against caching reads that raced a write.
+
+    Each invalidation stamps the board with a new, never reused generation. A
+    body is only stored if the board's generation did not change while it
+    was being built, so a read that started before a commit cannot put the
+    old state back into the cache after the invalidation ran.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.snapshots = TTLCache(maxsize, ttl)
+        self._generations = TTLCache(maxsize, ttl)
+        self._generation = 0
+
+    def invalidate(self, board_id: int) -> None:
+        self._generation += 1
+        self._generations.set(board_id, self._generation)
+        self.snapshots.invalidate_where(lambda key: key[1] == board_id)
+
+    async def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        board_id: int,
+        build: Callable[[], Awaitable[bytes]]
+    ) -> Response:
+        """Serve the cached body for ``key`` (a (kind, board_id) pair), building it on a miss."""
+        snapshot: Optional[Snapshot] = self.snapshots.get(key)
+        if snapshot is None:
+            generation = self._generations.get(board_id, 0)
+            snapshot = Snapshot(await build())
+            if self._generations.get(board_id, 0) == generation:
+                self.snapshots.set(key, snapshot)
+
+        headers = {"ETag": snapshot.etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+board_snapshots = SnapshotCache(settings.board_snapshot_max_entries, settings.board_snapshot_ttl_seconds)
+manager.add_invalidation_hook(board_snapshots.invalidate, scope=SNAPSHOT_SCOPE)
+
+
+def invalidate_board_snapshots(board_id: int) -> None:
+    manager.invalidate_board(board_id, scope=SNAPSHOT_SCOPE)
@@ -0,0 +1,132 @@
+"""Token-bucket rate limits for WebSocket clients: handshakes and the messages they send."""
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+# Limit key checked for every message, before it is parsed
+ALL_MESSAGES = "*"
+
+# Rejections are tallied over windows of this many seconds
+REJECTION_WINDOW = 10.0
+
+# Longest retry hint given to a rejected handshake (a rate of 0 never frees a slot)
+MAX_RETRY_AFTER = 60.0
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``capacity``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def reserve(self, now: float) -> float:
+        """Take a token even if it has not accrued yet; returns the seconds until it will have."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate) - 1
+        self.updated = now
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate if self.rate > 0 else float("inf")
+
+    def wait_time(self) -> float:
+        """Seconds until the next token, as of the last ``take``."""
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else float("inf")
+
+
+class MessageLimiter:
+    """One connection's buckets per message type, plus a tally of rejections.
+
+    Buckets are created on first use, so types a client never sends cost
+    nothing. Types without a configured limit are always allowed.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], max_rejected: int = 0):
+        self.limits = limits
+        self.max_rejected = max_rejected
+        self.rejected = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._window_started = time.monotonic()
+        self._window_rejected = 0
+
+    def _bucket(self, message_type: str) -> Optional[TokenBucket]:
+        bucket = self._buckets.get(message_type)
+        if bucket is None:
+            limit = self.limits.get(message_type)
+            if limit is None:
+                return None
+            bucket = self._buckets[message_type] = TokenBucket(*limit)
+        return bucket
+
+    def allow(self, message_type: str, tally: bool = True) -> bool:
+        """Take a token for ``message_type``. With ``tally=False`` a rejection does not
+        count toward ``exceeded``, for messages the caller coalesces instead of dropping."""
+        bucket = self._bucket(message_type)
+        if bucket is None:
+            return True
+        now = time.monotonic()
+        if bucket.take(now):
+            return True
+
+        self.rejected += 1
+        if not tally:
+            return False
+        if now - self._window_started >= REJECTION_WINDOW:
+            self._window_started = now
+            self._window_rejected = 0
+        self._window_rejected += 1
+        return False
+
+    def wait_time(self, message_type: str) -> float:
+        bucket = self._buckets.get(message_type)
+        return bucket.wait_time() if bucket is not None else 0.0
+
+    @property
+    def exceeded(self) -> bool:
+        """True once a client keeps sending far beyond its limits and should be closed."""
+        return self.max_rejected > 0 and self._window_rejected > self.max_rejected
+
+
+def retry_reason(message: str, retry_after: float) -> str:
+    """A close reason carrying a reconnect hint clients parse as ``retry_after=<seconds>``."""
+    return f"{message}; retry_after={retry_after:.1f}"
+
+
+class HandshakeAdmission:
+    """Caps the rate of new WebSocket connections, queueing short bursts.
+
+    Each handshake reserves the next token even if it has not accrued yet and
+    sleeps until it would have; tokens may go negative, so waiters are served
+    first come, first served. A handshake that would have to wait longer
+    than ``max_wait`` is not queued and gets the wait back as a retry hint.
+    """
+
+    def __init__(self, rate: float, burst: float, max_wait: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_wait = max_wait
+        self.waiting = 0
+
+    async def admit(self) -> Optional[float]:
+        """Wait for a slot. Returns None once admitted, else seconds to retry after."""
+        delay = self.bucket.reserve(time.monotonic())
+        if delay > self.max_wait:
+            self.bucket.tokens += 1  # give the reservation back
+            return min(delay, MAX_RETRY_AFTER)
+        if delay > 0:
+            self.waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self.waiting -= 1
+        return None
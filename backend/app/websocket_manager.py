@@ -1,143 +1,840 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import socket
+import time
+import uuid
+from collections import deque
 from fastapi import WebSocket
-from typing import Dict, Set, Optional
-from datetime import datetime
-from pydantic import ValidationError
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
+from pydantic import TypeAdapter, ValidationError
 
+from .backplane import Backplane, create_backplane
 from .config import get_settings
-from .constants import WSEventTypes
-from .schemas import WSMessage
+from .constants import WSEventTypes, WSMessageTypes, WSOverflowPolicies, WSSubprotocols
+from .cursors import CursorAggregator
+from .event_log import EventLogs
+from . import frames
+from .frames import Frame
+from .heartbeat import TimingWheel
+from .metrics import (
+    Gauge,
+    ws_broadcast_duration,
+    ws_broadcast_recipients,
+    ws_bytes_sent,
+    ws_dead_connections,
+    ws_frames_dropped,
+    ws_handshake_wait,
+    ws_handshakes,
+    ws_messages_rejected,
+    ws_messages_sent,
+)
+from .schemas import InboundWSMessage
+from .throttle import ALL_MESSAGES, HandshakeAdmission, MessageLimiter, retry_reason
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Board changes a reconnecting client must not miss; presence and cursors are resent on connect
+SEQUENCED_EVENT_TYPES = frozenset({
+    WSEventTypes.TASK_CREATED,
+    WSEventTypes.TASK_UPDATED,
+    WSEventTypes.TASK_MOVED,
+    WSEventTypes.TASK_DELETED,
+    WSEventTypes.TASKS_BATCH,
+})
+
+RATE_LIMITS = settings.ws_rate_limit_map
+
+# Compiled once; dispatches on "type" straight to the matching message model
+inbound_message = TypeAdapter(InboundWSMessage)
+
+
+class Connection:
+    """A single websocket with its own bounded outbound queue and writer task.
+
+    Broadcasting only appends to the queue; the writer task drains it, so a
+    slow client never blocks delivery to anyone else. Frames go out as
+    MessagePack binary messages when the client negotiated that subprotocol,
+    as JSON text otherwise.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        board_id: int,
+        user_id: str,
+        queue_size: int = settings.ws_send_queue_size,
+        overflow_policy: str = settings.ws_overflow_policy,
+        subprotocol: Optional[str] = None,
+    ):
+        self.websocket = websocket
+        self.board_id = board_id
+        self.user_id = user_id
+        self.binary = subprotocol == WSSubprotocols.MSGPACK
+        self.limiter = MessageLimiter(RATE_LIMITS, settings.ws_rate_limit_max_rejected)
+        # Latest cursor received over the rate limit, applied once the limit allows
+        self.deferred_cursor: Optional[dict] = None
+        self.deferred_handle: Optional[asyncio.TimerHandle] = None
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        # A logged task event was dropped from the queue: the client must resync
+        self.resync_pending = False
+        # (code, reason) once the connection is being closed by the server
+        self.closing: Optional[Tuple[int, str]] = None
+        # Heartbeat state: last message from the client, last ping sent, unanswered pings
+        self.last_seen = time.monotonic()
+        self.pinged_at: Optional[float] = None
+        self.missed_pings = 0
+        self._queue: Deque[Frame] = deque()
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self, on_dead) -> None:
+        self._writer = asyncio.create_task(self._run(on_dead))
+
+    def close(self) -> None:
+        writer = self._writer
+        if writer is not None and not writer.done() and writer is not asyncio.current_task():
+            writer.cancel()
+        self._queue.clear()
+        if self.deferred_handle is not None:
+            self.deferred_handle.cancel()
+            self.deferred_handle = None
+
+    def terminate(self, code: int, reason: str) -> None:
+        """Discard queued frames and have the writer close the socket."""
+        if self.closing is None:
+            self.closing = (code, reason)
+            self._queue.clear()
+            self._wakeup.set()
+
+    def enqueue(self, frame: Frame) -> bool:
+        """Queue a frame. Returns False if the connection is closing and must be dropped."""
+        if self.closing is not None:
+            return False
+
+        if len(self._queue) >= self.queue_size:
+            if self.overflow_policy == WSOverflowPolicies.DISCONNECT:
+                ws_dead_connections.inc("overflow")
+                self.terminate(1013, "Send queue overflow")
+                return False
+
+            replaced = False
+            if self.overflow_policy == WSOverflowPolicies.COALESCE:
+                replaced = self._coalesce(frame)
+            if not replaced:
+                if self._queue.popleft().seq is not None:
+                    self.resync_pending = True
+                self._queue.append(frame)
+            self.dropped += 1
+            ws_frames_dropped.inc(self.overflow_policy if replaced else WSOverflowPolicies.DROP_OLDEST)
+            return True
+
+        self._queue.append(frame)
+        self._wakeup.set()
+        return True
+
+    def _coalesce(self, frame: Frame) -> bool:
+        """Merge a frame into the last queued frame about the same subject, in its place.
+
+        Only the last one is merged into, so the frame still follows every
+        other queued frame about its subject.
+        """
+        key = frame.coalesce_key
+        if key is None:
+            return False
+        for index in range(len(self._queue) - 1, -1, -1):
+            if self._queue[index].coalesce_key == key:
+                self._queue[index] = self._queue[index].merge(frame)
+                return True
+        return False
+
+    def resync(self, frame: Frame) -> None:
+        """Replace every queued task event (and earlier resyncs) with one resync frame."""
+        self._queue = deque(
+            queued for queued in self._queue if queued.seq is None and queued.type != WSEventTypes.RESYNC
+        )
+        self._queue.append(frame)
+        self.resync_pending = False
+        self._wakeup.set()
+
+    async def _run(self, on_dead) -> None:
+        try:
+            while True:
+                while not self._queue and self.closing is None:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+
+                # Every write is time-limited: a stalled client would otherwise block
+                # the writer forever, and with it any close requested by terminate()
+                if self.closing is not None:
+                    code, reason = self.closing
+                    async with asyncio.timeout(settings.ws_send_timeout):
+                        await self.websocket.close(code=code, reason=reason)
+                    return
+
+                frame = self._queue.popleft()
+                async with asyncio.timeout(settings.ws_send_timeout):
+                    if self.binary:
+                        data = frame.binary
+                        await self.websocket.send_bytes(data)
+                        encoding = "msgpack"
+                    else:
+                        data = frame.text
+                        await self.websocket.send_text(data)
+                        encoding = "json"
+                ws_messages_sent.inc(encoding)
+                ws_bytes_sent.inc(encoding, amount=len(data))
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.info(f"Dropping stalled WebSocket on board {self.board_id}")
+            ws_dead_connections.inc("send_timeout")
+            on_dead(self)
+        except Exception as e:
+            logger.debug(f"WebSocket writer stopped: {e}")
+            ws_dead_connections.inc("send_failed")
+            on_dead(self)
 
 
 class ConnectionManager:
-    def __init__(self):
-        # board_id -> set of (websocket, user_id)
-        self.active_connections: Dict[int, Set[tuple]] = {}
+    """Tracks this worker's sockets and exchanges events and presence with peer workers.
+
+    Broadcasts are delivered to local sockets immediately and published on the
+    backplane for other workers. Presence and connection limits combine local
+    state with the counts peers last reported, so they are eventually
+    consistent across workers.
+
+    Presence is kept incrementally: per-user connection refcounts for local
+    sockets, and for each board with local sockets the set of users already
+    announced to them. A user appearing or disappearing anywhere sends local
+    sockets a ``user_joined``/``user_left`` delta stamped with the board's
+    presence version; only ``connection_established`` carries the full list.
+    """
+
+    def __init__(self, backplane: Optional[Backplane] = None):
+        # board_id -> websocket -> Connection
+        self.active_connections: Dict[int, Dict[WebSocket, Connection]] = {}
         self.user_cursors: Dict[int, Dict[str, dict]] = {}  # board_id -> user_id -> cursor_pos
+        self.cursor_updated_at: Dict[int, Dict[str, float]] = {}  # board_id -> user_id -> monotonic time
+        # board_id -> user_id -> cursor of users on peer workers, kept for boards with local sockets
+        # so connection_established can include them
+        self.remote_cursors: Dict[int, Dict[str, dict]] = {}
         self.user_connection_count: Dict[str, int] = {}  # user_id -> connection count
+        self.presence: Dict[int, Dict[str, int]] = {}  # board_id -> user_id -> local connection count
+        # board_id -> users announced to local sockets, and the version of that set
+        self.board_users: Dict[int, Set[str]] = {}
+        self.presence_versions: Dict[int, int] = {}
+        self.cursor_aggregator = CursorAggregator(self._flush_cursors, settings.cursor_tick_hz)
+        # Cursor moves per second clients are told to send: faster is never relayed
+        # sooner and only eats into their rate limits
+        self.cursor_send_hz = min(
+            [settings.cursor_tick_hz]
+            + [RATE_LIMITS[key][0] for key in (WSMessageTypes.CURSOR_MOVE, ALL_MESSAGES) if key in RATE_LIMITS]
+        )
+        self.event_logs = EventLogs(settings.ws_event_log_size, settings.ws_event_log_boards)
+        # One task pings idle connections, reaps unresponsive ones and expires idle cursors
+        self.heartbeats: TimingWheel[Connection] = TimingWheel(
+            settings.ws_heartbeat_interval,
+            settings.ws_heartbeat_slots,
+            self._check_heartbeat,
+            on_rotation=self._reap_idle_cursors,
+        )
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.backplane = backplane or create_backplane(settings.backplane_url)
+        # worker_id -> board_id -> user_id -> connection count, as last reported by peers
+        self.remote_presence: Dict[str, Dict[int, Dict[str, int]]] = {}
+        self._remote_seen: Dict[str, float] = {}
+        self._presence_task: Optional[asyncio.Task] = None
+        # scope -> hooks called with a board_id when cached per-board state must be
+        # dropped on every worker
+        self._invalidation_hooks: Dict[str, List[Callable[[int], None]]] = {}
+        # Hooks called with a user_id when cached per-user state must be dropped
+        self._user_invalidation_hooks: List[Callable[[int], None]] = []
+        self.admission = HandshakeAdmission(
+            settings.ws_handshake_rate, settings.ws_handshake_burst, settings.ws_handshake_max_wait
+        )
+        self.draining = False
+
+    async def startup(self):
+        await self.backplane.start(self._on_backplane_message)
+        self._presence_task = asyncio.create_task(self._presence_heartbeat())
+        self.heartbeats.start()
+
+    async def shutdown(self):
+        if self._presence_task is not None:
+            self._presence_task.cancel()
+            try:
+                await self._presence_task
+            except asyncio.CancelledError:
+                pass
+            self._presence_task = None
+        await self.heartbeats.stop()
+        await self.cursor_aggregator.stop()
+        self.backplane.publish({"kind": "bye", "origin": self.worker_id})
+        await self.backplane.stop()
+
+    def _live_remote_presence(self) -> Iterable[Dict[int, Dict[str, int]]]:
+        """Presence reported by peers, ignoring workers that stopped reporting."""
+        deadline = time.monotonic() - settings.backplane_presence_interval * 3
+        for worker_id, seen in list(self._remote_seen.items()):
+            if seen < deadline:
+                self._forget_worker(worker_id)
+        return self.remote_presence.values()
+
+    def _local_presence(self, board_id: int) -> Dict[str, int]:
+        return dict(self.presence.get(board_id, {}))
+
+    def _user_present(self, board_id: int, user_id: str) -> bool:
+        if self.presence.get(board_id, {}).get(user_id, 0) > 0:
+            return True
+        return any(boards.get(board_id, {}).get(user_id, 0) > 0 for boards in self.remote_presence.values())
+
+    def _update_presence(self, board_id: int, user_id: str, exclude_websocket: WebSocket = None):
+        """Announce a user to local sockets if their presence on the board changed."""
+        announced = self.board_users.get(board_id)
+        if announced is None or self.draining:
+            return  # no local sockets to tell, or they are all being closed
+
+        present = self._user_present(board_id, user_id)
+        if present == (user_id in announced):
+            return
+        if present:
+            announced.add(user_id)
+        else:
+            announced.discard(user_id)
+            # Clients drop the cursor of a user who left
+            self.remote_cursors.get(board_id, {}).pop(user_id, None)
+        version = self.presence_versions[board_id] = self.presence_versions.get(board_id, 0) + 1
+        self._deliver_local(
+            board_id,
+            Frame(WSEventTypes.USER_JOINED if present else WSEventTypes.USER_LEFT, {
+                "user_id": user_id,
+                "presence_version": version,
+            }),
+            exclude_websocket,
+        )
+
+    def _update_remote_presence(self, worker_id: str, board_id: int, users: Dict[str, int]):
+        """Store a peer's user counts for a board and announce the users whose presence flipped."""
+        boards = self.remote_presence.setdefault(worker_id, {})
+        previous = boards.get(board_id, {})
+        if users:
+            boards[board_id] = users
+        else:
+            boards.pop(board_id, None)
+        for user_id in previous.keys() | users.keys():
+            if (previous.get(user_id, 0) > 0) != (users.get(user_id, 0) > 0):
+                self._update_presence(board_id, user_id)
+
+    def _forget_worker(self, worker_id: str):
+        self._remote_seen.pop(worker_id, None)
+        for board_id, users in self.remote_presence.pop(worker_id, {}).items():
+            for user_id in users:
+                self._update_presence(board_id, user_id)
 
     def _check_connection_limits(self, board_id: int, user_id: str) -> Optional[str]:
-        """Check if connection limits are exceeded. Returns error message or None."""
+        """Check if connection limits are exceeded across all workers. Returns error message or None."""
+        remote = list(self._live_remote_presence())
+
         # Check per-user limit
-        current_user_connections = self.user_connection_count.get(user_id, 0)
+        current_user_connections = self.user_connection_count.get(user_id, 0) + sum(
+            users.get(user_id, 0) for boards in remote for users in boards.values()
+        )
         if current_user_connections >= settings.max_connections_per_user:
             return f"Maximum connections per user ({settings.max_connections_per_user}) exceeded"
-        
+
         # Check per-board limit
-        if board_id in self.active_connections:
-            if len(self.active_connections[board_id]) >= settings.max_connections_per_board:
-                return f"Maximum connections per board ({settings.max_connections_per_board}) exceeded"
-        
+        current_board_connections = len(self.active_connections.get(board_id, {})) + sum(
+            sum(boards.get(board_id, {}).values()) for boards in remote
+        )
+        if current_board_connections >= settings.max_connections_per_board:
+            return f"Maximum connections per board ({settings.max_connections_per_board}) exceeded"
+
         return None
 
-    async def connect(self, websocket: WebSocket, board_id: int, user_id: str) -> bool:
-        """Connect a websocket. Returns False if connection limits exceeded."""
+    async def connect(
+        self,
+        websocket: WebSocket,
+        board_id: int,
+        user_id: str,
+        since: Optional[int] = None,
+        epoch: Optional[str] = None
+    ) -> Optional[Connection]:
+        """Connect a websocket. Returns None if connection limits exceeded.
+
+        A client resuming with ``since``/``epoch`` from its last connection gets
+        the task events it missed replayed, or a resync event if they are gone.
+        """
         # Check limits before accepting
         limit_error = self._check_connection_limits(board_id, user_id)
         if limit_error:
             await websocket.close(code=1008, reason=limit_error)
-            return False
-        
-        await websocket.accept()
-        
+            return None
+
+        subprotocol = self.negotiate_subprotocol(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=subprotocol)
+
         if board_id not in self.active_connections:
-            self.active_connections[board_id] = set()
+            self.active_connections[board_id] = {}
             self.user_cursors[board_id] = {}
-        
-        self.active_connections[board_id].add((websocket, user_id))
+            self.remote_cursors[board_id] = {}
+            # Peers answer with the cursors of their users on the board
+            self.backplane.publish({"kind": "cursor_sync", "origin": self.worker_id, "board_id": board_id})
+
+        connection = Connection(websocket, board_id, user_id, subprotocol=subprotocol)
+        connection.start(self._remove_connection)
+        self.active_connections[board_id][websocket] = connection
+        self.heartbeats.add(connection)
         self.user_connection_count[user_id] = self.user_connection_count.get(user_id, 0) + 1
-        
-        # Notify others that user joined
-        await self.broadcast(
-            board_id,
-            {
-                "type": WSEventTypes.USER_JOINED,
-                "payload": {
-                    "user_id": user_id,
-                    "active_users": self.get_active_users(board_id)
-                },
-                "timestamp": datetime.utcnow().isoformat()
-            },
-            exclude_websocket=websocket
-        )
-        
+        board_presence = self.presence.setdefault(board_id, {})
+        board_presence[user_id] = board_presence.get(user_id, 0) + 1
+
+        if board_id not in self.board_users:
+            # First local socket on the board: start from the full set once
+            self.board_users[board_id] = set(self.get_active_users(board_id))
+        else:
+            # Notify others on this worker; peers learn of it from the presence update
+            self._update_presence(board_id, user_id, exclude_websocket=websocket)
+        # Queued before anything else can be broadcast to this connection
+        self._send_welcome(connection, since, epoch)
+        self._publish_presence(board_id)
+
+        return connection
+
+    @staticmethod
+    def negotiate_subprotocol(offered: List[str]) -> Optional[str]:
+        """The first subprotocol offered by the client that this server supports.
+
+        Clients offering none get JSON text frames without a subprotocol.
+        """
+        for subprotocol in offered:
+            if subprotocol == WSSubprotocols.JSON:
+                return subprotocol
+            if subprotocol == WSSubprotocols.MSGPACK and settings.ws_msgpack_enabled and frames.msgpack is not None:
+                return subprotocol
+        return None
+
+    async def admit_handshake(self, websocket: WebSocket) -> bool:
+        """Rate-limit new connections before any work is done for them.
+
+        Queued briefly under a burst; beyond that, or while draining, the socket
+        is closed with 1013 and a retry_after hint so clients spread their retries.
+        """
+        if self.draining:
+            retry_after = random.uniform(1.0, max(1.0, settings.ws_drain_seconds))
+            result = "draining"
+        else:
+            started = time.perf_counter()
+            retry_after = await self.admission.admit()
+            if retry_after is None:
+                ws_handshakes.inc("admitted")
+                ws_handshake_wait.observe(time.perf_counter() - started)
+                return True
+            result = "rejected"
+
+        ws_handshakes.inc(result)
+        # Accepted first: a close before the handshake completes reaches the browser without its code
+        await websocket.accept(subprotocol=self.negotiate_subprotocol(websocket.scope.get("subprotocols", [])))
+        await websocket.close(code=1013, reason=retry_reason("Server busy", retry_after))
+        return False
+
+    async def drain(self, duration: float = settings.ws_drain_seconds):
+        """Close every connection over ``duration`` seconds instead of all at once.
+
+        New handshakes are turned away meanwhile. Each client gets a random
+        retry hint within the window, so reconnections to the remaining
+        workers are spread out as well.
+        """
+        self.draining = True
+        connections = [conn for board in self.active_connections.values() for conn in board.values()]
+        if not connections:
+            return
+        random.shuffle(connections)
+        logger.info(f"Draining {len(connections)} WebSocket connections over {duration:.0f}s")
+
+        # At most ten batches per second
+        batches = max(1, min(len(connections), int(duration * 10)))
+        size = math.ceil(len(connections) / batches)
+        for start in range(0, len(connections), size):
+            for connection in connections[start:start + size]:
+                retry_after = random.uniform(1.0, max(1.0, duration))
+                connection.terminate(1012, retry_reason("Server restarting", retry_after))
+            await asyncio.sleep(duration / batches)
+
+    def _send_welcome(self, connection: Connection, since: Optional[int], epoch: Optional[str]):
+        board_id = connection.board_id
+        log = self.event_logs.get(board_id)
+        connection.enqueue(Frame(WSEventTypes.CONNECTION_ESTABLISHED, {
+            "active_users": self.get_active_users(board_id),
+            "presence_version": self.presence_versions.get(board_id, 0),
+            "cursors": {**self.remote_cursors.get(board_id, {}), **self.user_cursors.get(board_id, {})},
+            "cursor_hz": self.cursor_send_hz,
+            "seq": log.seq,
+            "epoch": log.epoch,
+        }))
+        if since is None:
+            return
+
+        missed = log.since(since) if epoch == log.epoch else None
+        if missed is None or len(missed) >= connection.queue_size:
+            # Too far behind to replay: the client reloads the board instead
+            connection.enqueue(Frame(WSEventTypes.RESYNC, {"seq": log.seq, "epoch": log.epoch}))
+            return
+        for frame in missed:
+            connection.enqueue(frame)
+
+    def _remove_connection(self, connection: Connection, stop_writer: bool = True) -> bool:
+        """Forget a connection and stop its writer. Safe to call more than once."""
+        board_connections = self.active_connections.get(connection.board_id)
+        if board_connections is None or board_connections.get(connection.websocket) is not connection:
+            return False
+
+        del board_connections[connection.websocket]
+        self.heartbeats.discard(connection)
+        if stop_writer:
+            connection.close()
+
+        board_id = connection.board_id
+        user_id = connection.user_id
+        if user_id in self.user_connection_count:
+            self.user_connection_count[user_id] -= 1
+            if self.user_connection_count[user_id] <= 0:
+                del self.user_connection_count[user_id]
+
+        board_presence = self.presence.get(board_id, {})
+        if user_id in board_presence:
+            board_presence[user_id] -= 1
+            if board_presence[user_id] <= 0:
+                del board_presence[user_id]
+
+        if not board_connections:
+            del self.active_connections[board_id]
+            self.presence.pop(board_id, None)
+            self.board_users.pop(board_id, None)
+            self.presence_versions.pop(board_id, None)
+            self.user_cursors.pop(board_id, None)
+            self.remote_cursors.pop(board_id, None)
+            self.cursor_updated_at.pop(board_id, None)
+            self.cursor_aggregator.forget(board_id)
+        else:
+            self._update_presence(board_id, user_id)
+        self._publish_presence(board_id)
         return True
 
     def disconnect(self, websocket: WebSocket, board_id: int, user_id: str):
-        if board_id in self.active_connections:
-            self.active_connections[board_id].discard((websocket, user_id))
-            
-            # Decrement user connection count
-            if user_id in self.user_connection_count:
-                self.user_connection_count[user_id] -= 1
-                if self.user_connection_count[user_id] <= 0:
-                    del self.user_connection_count[user_id]
-            
-            if user_id in self.user_cursors.get(board_id, {}):
-                del self.user_cursors[board_id][user_id]
-            
-            if not self.active_connections[board_id]:
-                del self.active_connections[board_id]
-                if board_id in self.user_cursors:
-                    del self.user_cursors[board_id]
+        connection = self.active_connections.get(board_id, {}).get(websocket)
+        if connection is not None:
+            self._remove_connection(connection)
+
+        self._forget_cursor(board_id, user_id)
 
     def get_active_users(self, board_id: int) -> list:
-        if board_id not in self.active_connections:
-            return []
-        return list(set(user_id for _, user_id in self.active_connections[board_id]))
+        announced = self.board_users.get(board_id)
+        if announced is not None:
+            return list(announced)
+        users = set(self.presence.get(board_id, {}))
+        for boards in self._live_remote_presence():
+            users.update(user_id for user_id, count in boards.get(board_id, {}).items() if count > 0)
+        return list(users)
+
+    def send_presence(self, connection: Connection):
+        """Send one connection the full presence list, e.g. after it saw a version gap."""
+        connection.enqueue(Frame(WSEventTypes.PRESENCE, {
+            "active_users": self.get_active_users(connection.board_id),
+            "presence_version": self.presence_versions.get(connection.board_id, 0),
+        }))
 
     async def broadcast(
-        self, 
-        board_id: int, 
-        message: dict, 
+        self,
+        board_id: int,
+        message: Union[Frame, dict],
         exclude_websocket: WebSocket = None
     ):
+        """Enqueue a frame for every connection on a board, on this and other workers.
+
+        Never waits on sockets. The frame is serialized at most once per worker,
+        however many sockets receive it.
+        """
+        frame = message if isinstance(message, Frame) else Frame.from_message(message)
+        self._deliver_local(board_id, frame, exclude_websocket)
+        self.backplane.publish(
+            {"kind": "event", "origin": self.worker_id, "board_id": board_id, "frame": frame.message},
+            # Too large for the transport: peers tell their clients to reload the board instead
+            fallback={"kind": "resync", "origin": self.worker_id, "board_id": board_id},
+        )
+
+    def _deliver_local(self, board_id: int, frame: Frame, exclude_websocket: WebSocket = None):
+        # Logged even without local sockets: a client may reconnect to this worker
+        if frame.type in SEQUENCED_EVENT_TYPES:
+            frame = self.event_logs.append(board_id, frame)
+
         if board_id not in self.active_connections:
             return
-        
-        dead_connections = set()
-        
-        for websocket, user_id in self.active_connections[board_id]:
+
+        started = time.perf_counter()
+        overflowed = []
+        recipients = 0
+
+        for websocket, connection in self.active_connections[board_id].items():
             if websocket == exclude_websocket:
                 continue
-            try:
-                await websocket.send_json(message)
-            except Exception:
-                dead_connections.add((websocket, user_id))
-        
-        # Clean up dead connections
-        for conn in dead_connections:
-            websocket, user_id = conn
-            self.active_connections[board_id].discard(conn)
-            if user_id in self.user_connection_count:
-                self.user_connection_count[user_id] -= 1
-                if self.user_connection_count[user_id] <= 0:
-                    del self.user_connection_count[user_id]
+            recipients += 1
+            if not connection.enqueue(frame):
+                overflowed.append(connection)
+            elif connection.resync_pending:
+                # It lost a task event to a full queue; the log cannot fill the gap for it
+                log = self.event_logs.get(board_id)
+                connection.resync(Frame(WSEventTypes.RESYNC, {"seq": log.seq, "epoch": log.epoch}))
+
+        ws_broadcast_duration.observe(time.perf_counter() - started)
+        ws_broadcast_recipients.observe(recipients)
+
+        # Slow consumers under the disconnect policy are dropped; their writer closes the socket
+        for connection in overflowed:
+            logger.warning(f"Dropping slow WebSocket consumer on board {board_id}")
+            self._remove_connection(connection, stop_writer=False)
+
+    def _resync_local(self, board_id: int):
+        """An event of the board never reached this worker: every client of it reloads the board."""
+        log = self.event_logs.reset(board_id)
+        frame = Frame(WSEventTypes.RESYNC, {"seq": log.seq, "epoch": log.epoch})
+        for connection in self.active_connections.get(board_id, {}).values():
+            connection.enqueue(frame)
 
     async def broadcast_cursor(self, board_id: int, user_id: str, cursor_data: dict):
-        self.user_cursors.setdefault(board_id, {})[user_id] = cursor_data
-        
-        await self.broadcast(
-            board_id,
-            {
-                "type": WSEventTypes.CURSOR_MOVE,
-                "payload": {
-                    "user_id": user_id,
-                    "cursor": cursor_data
-                },
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
+        """Record a cursor move; it goes out with the board's next batched cursors frame."""
+        self._set_cursor(board_id, user_id, cursor_data)
+
+    def _set_cursor(self, board_id: int, user_id: str, cursor: dict):
+        self.user_cursors.setdefault(board_id, {})[user_id] = cursor
+        self.cursor_updated_at.setdefault(board_id, {})[user_id] = time.monotonic()
+        self.cursor_aggregator.update(board_id, user_id, cursor)
+
+    def _forget_cursor(self, board_id: int, user_id: str):
+        had_cursor = self.user_cursors.get(board_id, {}).pop(user_id, None) is not None
+        self.cursor_updated_at.get(board_id, {}).pop(user_id, None)
+        if had_cursor and board_id in self.active_connections:
+            # Tell viewers here and on peers that it is gone
+            self.cursor_aggregator.remove(board_id, user_id)
+        else:
+            self.cursor_aggregator.forget(board_id, user_id)
 
-    def validate_message(self, data: str) -> Optional[WSMessage]:
-        """Validate incoming WebSocket message."""
+    def _record_remote_cursors(self, board_id: int, cursors: Dict[str, Optional[dict]]):
+        board_cursors = self.remote_cursors.get(board_id)
+        if board_cursors is None:
+            return
+        for user_id, cursor in cursors.items():
+            if cursor is None:
+                board_cursors.pop(user_id, None)
+            else:
+                board_cursors[user_id] = cursor
+
+    def _answer_cursor_sync(self, board_id: int):
+        cursors = self.user_cursors.get(board_id)
+        if not cursors:
+            return
+        # Only the asking peer lacks them; sockets here already have these positions
+        self.backplane.publish({
+            "kind": "event",
+            "origin": self.worker_id,
+            "board_id": board_id,
+            "frame": Frame(WSEventTypes.CURSORS, {"cursors": dict(cursors)}).message,
+        })
+
+    def admit(self, connection: Connection, message_type: str) -> bool:
+        """Whether a client's message is within its rate limit for ``message_type``."""
+        if connection.limiter.allow(message_type):
+            return True
+        ws_messages_rejected.inc(message_type, "dropped")
+        return False
+
+    def defer_cursor(self, connection: Connection, cursor: dict):
+        """Hold a cursor move that is over the limit; only the latest is applied, when it allows."""
+        ws_messages_rejected.inc(WSMessageTypes.CURSOR_MOVE, "coalesced")
+        connection.deferred_cursor = cursor
+        if connection.deferred_handle is None:
+            delay = connection.limiter.wait_time(WSMessageTypes.CURSOR_MOVE)
+            connection.deferred_handle = asyncio.get_running_loop().call_later(
+                delay, self._apply_deferred_cursor, connection
+            )
+
+    def _apply_deferred_cursor(self, connection: Connection):
+        connection.deferred_handle = None
+        cursor, connection.deferred_cursor = connection.deferred_cursor, None
+        board_connections = self.active_connections.get(connection.board_id, {})
+        if cursor is None or board_connections.get(connection.websocket) is not connection:
+            return
+        if not connection.limiter.allow(WSMessageTypes.CURSOR_MOVE, tally=False):
+            self.defer_cursor(connection, cursor)
+            return
+        self._set_cursor(connection.board_id, connection.user_id, cursor)
+
+    def _check_heartbeat(self, connection: Connection, now: float):
+        """Visited by the heartbeat wheel once per interval for every connection."""
+        if now - connection.last_seen < settings.ws_heartbeat_interval:
+            # Heard from recently enough; no ping needed
+            connection.missed_pings = 0
+            return
+
+        if connection.pinged_at is not None and connection.last_seen < connection.pinged_at:
+            connection.missed_pings += 1
+            if connection.missed_pings >= settings.ws_heartbeat_max_missed:
+                logger.info(f"Closing unresponsive WebSocket on board {connection.board_id}")
+                ws_dead_connections.inc("heartbeat")
+                connection.terminate(4002, "Heartbeat timeout")
+                # Freed now, not when the half-open socket finally errors
+                self._remove_connection(connection, stop_writer=False)
+                return
+        connection.pinged_at = now
+        connection.enqueue(Frame(WSEventTypes.PING, {}))
+
+    def _reap_idle_cursors(self, now: float):
+        """Drop cursors not moved for a while, or left behind by users no longer on the board."""
+        deadline = now - settings.ws_cursor_idle_seconds
+        for board_id, updated in list(self.cursor_updated_at.items()):
+            present = self.presence.get(board_id, {})
+            for user_id, updated_at in list(updated.items()):
+                if updated_at < deadline or user_id not in present:
+                    self._forget_cursor(board_id, user_id)
+
+    async def _flush_cursors(self, board_id: int, cursors: Dict[str, Optional[dict]]):
+        await self.broadcast(board_id, Frame(WSEventTypes.CURSORS, {"cursors": cursors}))
+
+    def _publish_presence(self, board_id: int):
+        self.backplane.publish({
+            "kind": "presence",
+            "origin": self.worker_id,
+            "board_id": board_id,
+            "users": self._local_presence(board_id),
+        })
+
+    async def _presence_heartbeat(self):
+        """Periodically publish a full snapshot so peers can expire crashed workers."""
+        while True:
+            # Expire peers that stopped reporting, announcing their users as gone
+            self._live_remote_presence()
+            self.backplane.publish({
+                "kind": "presence_snapshot",
+                "origin": self.worker_id,
+                "boards": {str(board_id): self._local_presence(board_id) for board_id in self.active_connections},
+            })
+            await asyncio.sleep(settings.backplane_presence_interval)
+
+    def add_invalidation_hook(self, hook: Callable[[int], None], scope: str = "board"):
+        self._invalidation_hooks.setdefault(scope, []).append(hook)
+
+    def invalidate_board(self, board_id: int, scope: Optional[str] = None, local: bool = True):
+        """Drop cached state for a board on this worker and all peers.
+
+        Only hooks registered for ``scope`` run; with no scope, all of them do.
+        ``local=False`` only tells peers, for state this worker updated in place.
+        """
+        if local:
+            self._run_invalidation_hooks(board_id, scope)
+        self.backplane.publish({
+            "kind": "invalidate",
+            "origin": self.worker_id,
+            "board_id": board_id,
+            "scope": scope,
+        })
+
+    def _run_invalidation_hooks(self, board_id: int, scope: Optional[str] = None):
+        if scope is None:
+            hooks = [hook for scoped in self._invalidation_hooks.values() for hook in scoped]
+        else:
+            hooks = self._invalidation_hooks.get(scope, [])
+        for hook in hooks:
+            try:
+                hook(board_id)
+            except Exception as e:
+                logger.error(f"Invalidation hook failed for board {board_id}: {e}")
+
+    def add_user_invalidation_hook(self, hook: Callable[[int], None]):
+        self._user_invalidation_hooks.append(hook)
+
+    def invalidate_user(self, user_id: int):
+        """Drop cached state for a user on this worker and all peers."""
+        self._run_user_invalidation_hooks(user_id)
+        self.backplane.publish({
+            "kind": "invalidate_user",
+            "origin": self.worker_id,
+            "user_id": user_id,
+        })
+
+    def _run_user_invalidation_hooks(self, user_id: int):
+        for hook in self._user_invalidation_hooks:
+            try:
+                hook(user_id)
+            except Exception as e:
+                logger.error(f"Invalidation hook failed for user {user_id}: {e}")
+
+    def _on_backplane_message(self, message: dict):
+        origin = message.get("origin")
+        if origin is None or origin == self.worker_id:
+            return
+
+        kind = message.get("kind")
+        if kind == "event":
+            frame = Frame.from_message(message["frame"])
+            if frame.type == WSEventTypes.CURSORS:
+                self._record_remote_cursors(int(message["board_id"]), frame.payload.get("cursors") or {})
+            self._deliver_local(int(message["board_id"]), frame)
+        elif kind == "presence":
+            self._remote_seen[origin] = time.monotonic()
+            self._update_remote_presence(origin, int(message["board_id"]), message.get("users") or {})
+        elif kind == "presence_snapshot":
+            self._remote_seen[origin] = time.monotonic()
+            boards = {int(board_id): users for board_id, users in message.get("boards", {}).items() if users}
+            for board_id in self.remote_presence.get(origin, {}).keys() | boards.keys():
+                self._update_remote_presence(origin, board_id, boards.get(board_id, {}))
+        elif kind == "resync":
+            self._resync_local(int(message["board_id"]))
+        elif kind == "invalidate":
+            self._run_invalidation_hooks(int(message["board_id"]), message.get("scope"))
+        elif kind == "cursor_sync":
+            self._answer_cursor_sync(int(message["board_id"]))
+        elif kind == "invalidate_user":
+            self._run_user_invalidation_hooks(int(message["user_id"]))
+        elif kind == "bye":
+            self._forget_worker(origin)
+
+    def decode_message(self, data: Union[str, bytes]) -> Optional[InboundWSMessage]:
+        """Parse and validate a client message (JSON text or MessagePack binary).
+
+        Returns None for oversized, malformed or unknown messages.
+        """
+        if len(data) > settings.ws_max_message_bytes:
+            ws_messages_rejected.inc("unknown", "too_large")
+            return None
         try:
-            import json
-            parsed = json.loads(data)
-            return WSMessage.model_validate(parsed)
-        except (json.JSONDecodeError, ValidationError):
+            if isinstance(data, str):
+                # Parsed and validated in one pass by pydantic-core
+                return inbound_message.validate_json(data)
+            if frames.msgpack is None:
+                return None
+            return inbound_message.validate_python(frames.unpackb(data))
+        except (ValueError, TypeError, ValidationError):
+            ws_messages_rejected.inc("unknown", "invalid")
             return None
 
 
 manager = ConnectionManager()
+
+Gauge(
+    "ws_connections",
+    "Open WebSocket connections on this worker, per board",
+    ("board_id",),
+    collect=lambda: [((str(board_id),), len(conns)) for board_id, conns in list(manager.active_connections.items())],
+)
+
+Gauge(
+    "ws_handshakes_waiting",
+    "WebSocket handshakes queued for admission on this worker",
+    collect=lambda: [((), manager.admission.waiting)],
+)
@@ -0,0 +1,67 @@
+"""Serialization cost per broadcast event as board size grows.
+
+Compares the old path (``send_json`` re-encoding the event for every viewer)
+with an encode-once ``Frame`` shared by all viewers.
+
+    cd backend && python -m benchmarks.bench_serialization
+"""
+import json
+import time
+from datetime import datetime
+
+from app.frames import Frame
+from app.schemas import TaskResponse
+
+BOARD_SIZES = (1, 10, 50, 200)
+EVENTS = 2000
+
+
+def _sample_task() -> dict:
+    now = datetime.utcnow()
+    return {
+        "id": 42,
+        "title": "Write the quarterly report",
+        "description": "Collect numbers from finance and summarise the highlights. " * 4,
+        "status": "in_progress",
+        "assigned_to": "alice",
+        "board_id": 7,
+        "position": 3,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def per_recipient(task: dict, viewers: int) -> None:
+    message = {
+        "type": "task_updated",
+        "payload": TaskResponse.model_validate(task).model_dump(mode="json"),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+    for _ in range(viewers):
+        json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_once(task: dict, viewers: int) -> None:
+    frame = Frame("task_updated", TaskResponse.model_validate(task).model_dump())
+    for _ in range(viewers):
+        frame.text
+
+
+def _time_per_event(fn, task: dict, viewers: int) -> float:
+    start = time.perf_counter()
+    for _ in range(EVENTS):
+        fn(task, viewers)
+    return (time.perf_counter() - start) / EVENTS * 1e6
+
+
+def main() -> None:
+    task = _sample_task()
+    print(f"{'viewers':>8} {'per-recipient us':>18} {'encode-once us':>16} {'speedup':>8}")
+    for viewers in BOARD_SIZES:
+        old = _time_per_event(per_recipient, task, viewers)
+        new = _time_per_event(encode_once, task, viewers)
+        print(f"{viewers:>8} {old:>18.1f} {new:>16.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
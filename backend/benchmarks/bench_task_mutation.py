@@ -0,0 +1,94 @@
+"""Round trips and latency of PATCH /api/tasks/{id}: previous path vs guarded UPDATE ... RETURNING.
+
+Runs against DATABASE_URL (use a scratch database; it is seeded with a
+user, a board and a few tasks):
+
+    cd backend && DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_task_mutation
+"""
+import asyncio
+import statistics
+import time
+
+from fastapi import BackgroundTasks
+from sqlalchemy import event, select
+from sqlalchemy.orm import selectinload
+
+from app.database import async_session_maker, engine, init_db
+from app.models import Board, Task, TaskStatus, User
+from app.routers.tasks import update_task
+from app.schemas import TaskUpdate
+
+ITERATIONS = 500
+STATUSES = list(TaskStatus)
+
+
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine.sync_engine, "commit", self._on_commit)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def _on_commit(self, *args):
+        self.count += 1
+
+
+async def legacy_update(task_id: int, data: dict, db, user: User) -> Task:
+    """The pre-RETURNING path: load task, load board + members, flush, refresh."""
+    db_task = (await db.execute(select(Task).where(Task.id == task_id))).scalar_one()
+    board = (await db.execute(
+        select(Board).options(selectinload(Board.members)).where(Board.id == db_task.board_id)
+    )).scalar_one()
+    assert board.owner_id == user.id or user in board.members or board.is_public
+    for field, value in data.items():
+        setattr(db_task, field, value)
+    await db.commit()
+    await db.refresh(db_task)
+    return db_task
+
+
+async def fast_update(task_id: int, data: dict, db, user: User) -> Task:
+    return await update_task(task_id, TaskUpdate(**data), BackgroundTasks(), db, user)
+
+
+async def seed():
+    await init_db()
+    async with async_session_maker() as db:
+        user = User(username=f"bench-{time.time_ns()}", email=f"{time.time_ns()}@bench.local", hashed_password="x")
+        board = Board(name="bench", owner=user)
+        tasks = [Task(title=f"task {i}", board=board) for i in range(20)]
+        db.add_all([user, board, *tasks])
+        await db.commit()
+        return user.id, [task.id for task in tasks]
+
+
+async def run(label: str, fn, user_id: int, task_ids: list, counter: RoundTripCounter):
+    latencies = []
+    counter.count = 0
+    for i in range(ITERATIONS):
+        data = {"status": STATUSES[i % len(STATUSES)]}
+        async with async_session_maker() as db:
+            user = await db.get(User, user_id)
+            before = counter.count
+            start = time.perf_counter()
+            await fn(task_ids[i % len(task_ids)], data, db, user)
+            latencies.append((time.perf_counter() - start) * 1000)
+            round_trips = counter.count - before
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<10} round trips/update: {round_trips:>2}   "
+          f"p50: {statistics.median(latencies):6.2f} ms   p99: {p99:6.2f} ms")
+
+
+async def main():
+    user_id, task_ids = await seed()
+    counter = RoundTripCounter()
+    await run("previous", legacy_update, user_id, task_ids, counter)
+    await run("returning", fast_update, user_id, task_ids, counter)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,365 @@
+"""End-to-end load test: WebSocket viewers per board plus REST writers.
+
+Starts the API with ``app.server`` in a subprocess, against Postgres or a
+throwaway SQLite file (the in-process stand-in, needs aiosqlite). Then:
+
+* connects ``--viewers`` WebSocket clients to each of ``--boards`` boards,
+  measuring the server's RSS growth per connection;
+* runs ``--writers`` REST clients for ``--duration`` seconds, each creating
+  tasks and moving them between columns (every move also retitles the task,
+  so each event is unique);
+* times every event from just before the writer's request to its arrival
+  at each viewer.
+
+Results are written as JSON (``--output``, default
+``benchmarks/results/load-<timestamp>.json``) so runs can be compared:
+
+    cd backend && pip install -r benchmarks/requirements.txt
+    cd backend && python -m benchmarks.load_test --boards 5 --viewers 20 --writers 10
+    cd backend && python -m benchmarks.load_test --database-url postgresql+asyncpg://...
+
+Clients share one process and event loop, so on a saturated machine part
+of the measured latency is client-side; compare runs made on the same host.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+from app.constants import WSSubprotocols
+from app.frames import packb, unpackb
+from app.models import TaskStatus
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+STATUSES = [status.value for status in TaskStatus]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process (Linux /proc, else psutil when installed)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process(pid).memory_info().rss
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _summary_ms(values: List[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round(_percentile(values, 50) * 1000, 3) if values else None,
+        "p99_ms": round(_percentile(values, 99) * 1000, 3) if values else None,
+        "max_ms": round(max(values) * 1000, 3) if values else None,
+        "mean_ms": round(statistics.fmean(values) * 1000, 3) if values else None,
+    }
+
+
+class Server:
+    """The API under test, running in its own process."""
+
+    def __init__(self, database_url: str, port: int, workers: int):
+        self.database_url = database_url
+        self.port = port
+        self.workers = workers
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def env(self) -> dict:
+        return {
+            **os.environ,
+            "DATABASE_URL": self.database_url,
+            "MAX_CONNECTIONS_PER_USER": "100000",
+            "MAX_CONNECTIONS_PER_BOARD": "100000",
+            # Viewers all connect at once; admission control is not what is being measured
+            "WS_HANDSHAKE_RATE": "100000",
+            "WS_HANDSHAKE_BURST": "100000",
+            "WS_HANDSHAKE_MAX_WAIT": "60",
+            # Registration speed is not what is being measured
+            "BCRYPT_ROUNDS": "4",
+        }
+
+    def migrate(self) -> None:
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            cwd=BACKEND_DIR, env=self.env, check=True, capture_output=True,
+        )
+
+    async def start(self) -> None:
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "app.server",
+                "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(self.workers), "--log-level", "warning",
+            ],
+            cwd=BACKEND_DIR, env=self.env,
+        )
+        async with httpx.AsyncClient() as client:
+            for _ in range(100):
+                try:
+                    if (await client.get(f"{self.url}/metrics")).status_code == 200:
+                        return
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise RuntimeError("API server did not start")
+
+    def stop(self) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def rss(self) -> Optional[int]:
+        return _rss_bytes(self.process.pid) if self.process is not None and self.workers == 1 else None
+
+
+class LoadTest:
+    def __init__(self, server: Server, args: argparse.Namespace):
+        self.server = server
+        self.args = args
+        self.token = ""
+        self.board_ids: List[int] = []
+        # event title -> perf_counter just before the writer sent the request
+        self.sent_at: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.request_latencies: List[float] = []
+        self.request_errors = 0
+        self.viewers_connected = 0
+        self.handshake_retries = 0
+        self.expected_deliveries = 0
+        self.stopping = asyncio.Event()
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def setup(self, client: httpx.AsyncClient) -> None:
+        name = f"load-{time.time_ns()}"
+        response = await client.post("/api/auth/register", json={
+            "username": name, "email": f"{name}@example.com", "password": "load-test-password",
+        })
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+        for n in range(self.args.boards):
+            response = await client.post("/api/boards/", json={"name": f"load {n}"}, headers=self.headers)
+            response.raise_for_status()
+            self.board_ids.append(response.json()["id"])
+
+    async def connect_viewer(self, board_id: int):
+        """Open a viewer socket, retrying handshakes turned away with 1013 after their retry_after hint."""
+        ws_url = self.server.url.replace("http", "ws", 1)
+        subprotocols = [WSSubprotocols.MSGPACK] if self.args.encoding == "msgpack" else None
+        while True:
+            ws = await websockets.connect(
+                f"{ws_url}/ws/{board_id}?token={self.token}", subprotocols=subprotocols, max_queue=None
+            )
+            try:
+                await ws.recv()  # connection_established
+                return ws
+            except websockets.ConnectionClosed as e:
+                if e.rcvd is None or e.rcvd.code != 1013:
+                    raise
+                self.handshake_retries += 1
+                hint = re.search(r"retry_after=([\d.]+)", e.rcvd.reason)
+                await asyncio.sleep((float(hint.group(1)) if hint else 1.0) + random.random())
+
+    async def viewer(self, board_id: int, ready: asyncio.Event) -> None:
+        ws = await self.connect_viewer(board_id)
+        try:
+            self.viewers_connected += 1
+            if self.viewers_connected == self.args.boards * self.args.viewers:
+                ready.set()
+            while not self.stopping.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                received = time.perf_counter()
+                event = unpackb(raw) if isinstance(raw, bytes) else json.loads(raw)
+                if event["type"] == "ping":
+                    # Server heartbeat: unanswered, the viewer would be closed with 4002
+                    pong = {"type": "pong", "payload": {}}
+                    await ws.send(packb(pong) if self.args.encoding == "msgpack" else json.dumps(pong))
+                elif event["type"] in ("task_created", "task_moved"):
+                    sent = self.sent_at.get(event["payload"]["title"])
+                    if sent is not None:
+                        self.latencies.append(received - sent)
+        finally:
+            await ws.close()
+
+    async def writer(self, client: httpx.AsyncClient, number: int, deadline: float) -> None:
+        board_id = self.board_ids[number % len(self.board_ids)]
+        task_id = None
+        step = 0
+        while time.perf_counter() < deadline:
+            title = f"w{number}-{step}"
+            started = time.perf_counter()
+            self.sent_at[title] = started
+            try:
+                if task_id is None or step % 5 == 0:
+                    response = await client.post(
+                        "/api/tasks/", json={"title": title, "board_id": board_id}, headers=self.headers
+                    )
+                else:
+                    response = await client.patch(
+                        f"/api/tasks/{task_id}",
+                        json={"title": title, "status": STATUSES[step % len(STATUSES)]},
+                        headers=self.headers,
+                    )
+                response.raise_for_status()
+                task_id = response.json()["id"]
+                self.expected_deliveries += self.args.viewers
+            except httpx.HTTPError:
+                self.request_errors += 1
+            self.request_latencies.append(time.perf_counter() - started)
+            step += 1
+
+    async def run(self) -> dict:
+        limits = httpx.Limits(max_connections=self.args.writers + 5)
+        async with httpx.AsyncClient(base_url=self.server.url, limits=limits, timeout=30) as client:
+            await self.setup(client)
+
+            rss_before = self.server.rss()
+            ready = asyncio.Event()
+            viewers = [
+                asyncio.create_task(self.viewer(board_id, ready))
+                for board_id in self.board_ids
+                for _ in range(self.args.viewers)
+            ]
+            await asyncio.wait_for(ready.wait(), timeout=60)
+            await asyncio.sleep(1.0)
+            rss_after = self.server.rss()
+
+            started = time.perf_counter()
+            deadline = started + self.args.duration
+            await asyncio.gather(*(self.writer(client, n, deadline) for n in range(self.args.writers)))
+            elapsed = time.perf_counter() - started
+
+            # Let in-flight events arrive
+            await asyncio.sleep(2.0)
+            self.stopping.set()
+            await asyncio.gather(*viewers, return_exceptions=True)
+
+        connections = self.args.boards * self.args.viewers
+        per_connection = None
+        if rss_before is not None and rss_after is not None:
+            per_connection = (rss_after - rss_before) / connections
+        return {
+            "viewers": connections,
+            "handshake_retries": self.handshake_retries,
+            "requests": len(self.request_latencies),
+            "request_errors": self.request_errors,
+            "requests_per_second": round(len(self.request_latencies) / elapsed, 1),
+            "request_latency": _summary_ms(self.request_latencies),
+            "event_latency": _summary_ms(self.latencies),
+            "events_expected": self.expected_deliveries,
+            "events_delivered": len(self.latencies),
+            "server_rss_bytes": rss_after,
+            "memory_per_connection_bytes": round(per_connection) if per_connection is not None else None,
+        }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> dict:
+    scratch = None
+    database_url = args.database_url
+    if not database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        database_url = f"sqlite+aiosqlite:///{scratch.name}"
+
+    server = Server(database_url, args.port or _free_port(), args.workers)
+    server.migrate()
+    await server.start()
+    try:
+        results = await LoadTest(server, args).run()
+    finally:
+        server.stop()
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+    return {
+        "started_at": datetime.utcnow().isoformat(),
+        "git_revision": _git_revision(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "database": "postgresql" if database_url.startswith("postgres") else "sqlite",
+            "boards": args.boards,
+            "viewers_per_board": args.viewers,
+            "writers": args.writers,
+            "duration_seconds": args.duration,
+            "server_workers": args.workers,
+            "encoding": args.encoding,
+        },
+        "results": results,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--boards", type=int, default=5)
+    parser.add_argument("--viewers", type=int, default=20, help="WebSocket viewers per board")
+    parser.add_argument("--writers", type=int, default=10, help="concurrent REST writers")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of writes")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (RSS is only measured with 1)")
+    parser.add_argument("--encoding", choices=("json", "msgpack"), default="json", help="viewers' WebSocket encoding")
+    parser.add_argument("--database-url", default=os.environ.get("LOAD_TEST_DATABASE_URL"),
+                        help="scratch database; a temporary SQLite file when omitted")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON results file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    output = args.output or RESULTS_DIR / f"load-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {output}")
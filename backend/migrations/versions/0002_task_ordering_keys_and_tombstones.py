@@ -0,0 +1,70 @@
+"""Fractional ordering keys, delta sync index and task tombstones
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.ordering import evenly_spaced_keys
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tasks",
+        sa.Column(
+            "position_key",
+            sa.String(64).with_variant(sa.String(64, collation="C"), "postgresql"),
+            nullable=False,
+            server_default="V",
+        ),
+    )
+
+    # Give existing tasks keys that follow their old integer positions
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, board_id, status FROM tasks ORDER BY board_id, status, position, id"
+    ))
+    columns = defaultdict(list)
+    for task_id, board_id, status in rows:
+        columns[(board_id, status)].append(task_id)
+    tasks = sa.table("tasks", sa.column("id", sa.Integer), sa.column("position_key", sa.String))
+    for ids in columns.values():
+        bind.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam("task_id")),
+            [{"task_id": i, "position_key": k} for i, k in zip(ids, evenly_spaced_keys(len(ids)))],
+        )
+
+    op.create_index(
+        "ix_tasks_board_status_position_key", "tasks", ["board_id", "status", "position_key"]
+    )
+    op.create_index("ix_tasks_board_updated_at", "tasks", ["board_id", "updated_at"])
+
+    op.create_table(
+        "task_tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "board_id", sa.Integer(), sa.ForeignKey("boards.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_task_tombstones_board_deleted_at", "task_tombstones", ["board_id", "deleted_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("task_tombstones")
+    op.drop_index("ix_tasks_board_updated_at", table_name="tasks")
+    op.drop_index("ix_tasks_board_status_position_key", table_name="tasks")
+    op.drop_column("tasks", "position_key")
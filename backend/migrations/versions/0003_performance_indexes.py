@@ -0,0 +1,30 @@
+"""Indexes for the hot board and membership queries
+
+tasks.board_id is already covered by the composite indexes of 0002.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Owned boards, and the ON DELETE check when a user is removed
+    op.create_index("ix_boards_owner_id", "boards", ["owner_id"])
+    # Keyset pagination of GET /api/boards, newest first
+    op.create_index("ix_boards_created_at_id", "boards", ["created_at", "id"])
+    # The (user_id, board_id) primary key does not serve lookups by board
+    op.create_index("ix_board_members_board_id", "board_members", ["board_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_board_members_board_id", table_name="board_members")
+    op.drop_index("ix_boards_created_at_id", table_name="boards")
+    op.drop_index("ix_boards_owner_id", table_name="boards")
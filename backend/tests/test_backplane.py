@@ -0,0 +1,165 @@
+"""Cross-worker delivery through the backplanes, against in-process stand-ins."""
+import asyncio
+
+import pytest
+
+from app.backplane import PostgresBackplane, RedisBackplane
+from app.constants import WSEventTypes
+from app.frames import Frame, loads
+from app.websocket_manager import Connection, ConnectionManager
+
+BOARD_ID = 1
+
+
+def _watch(manager: ConnectionManager) -> Connection:
+    """A local connection on BOARD_ID whose queued frames the test reads."""
+    websocket = object()
+    connection = Connection(websocket, BOARD_ID, "2")
+    manager.active_connections[BOARD_ID] = {websocket: connection}
+    return connection
+
+
+async def _until(predicate, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+class _FakeWebSocket:
+    """Accepts the handshake and records the messages sent to the client."""
+
+    def __init__(self):
+        self.scope = {"subprotocols": []}
+        self.sent: list = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data: str):
+        self.sent.append(loads(data))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+    def events(self, event_type: str) -> list:
+        return [message["payload"] for message in self.sent if message["type"] == event_type]
+
+
+def _use_fakeredis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.asyncio, "from_url", lambda url: fakeredis.FakeAsyncRedis(server=server))
+
+
+def test_redis_backplane_delivers_between_managers(monkeypatch):
+    _use_fakeredis(monkeypatch)
+
+    async def scenario():
+        sender = ConnectionManager(RedisBackplane("redis://stand-in"))
+        receiver = ConnectionManager(RedisBackplane("redis://stand-in"))
+        await sender.backplane.start(sender._on_backplane_message)
+        await receiver.backplane.start(receiver._on_backplane_message)
+        try:
+            watcher = _watch(receiver)
+            await sender.broadcast(BOARD_ID, Frame(WSEventTypes.TASK_UPDATED, {"id": 7, "title": "t"}))
+            await _until(lambda: watcher._queue)
+            frame = watcher._queue[0]
+            assert (frame.type, frame.payload) == (WSEventTypes.TASK_UPDATED, {"id": 7, "title": "t"})
+            assert frame.seq == 1
+        finally:
+            await sender.backplane.stop()
+            await receiver.backplane.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cursors_reach_viewers_on_other_workers(monkeypatch):
+    _use_fakeredis(monkeypatch)
+
+    async def scenario():
+        first = ConnectionManager(RedisBackplane("redis://stand-in"))
+        second = ConnectionManager(RedisBackplane("redis://stand-in"))
+        await first.backplane.start(first._on_backplane_message)
+        await second.backplane.start(second._on_backplane_message)
+        try:
+            await first.connect(_FakeWebSocket(), BOARD_ID, "1")
+            await first.broadcast_cursor(BOARD_ID, "1", {"x": 10, "y": 20})
+            await asyncio.sleep(0.2)
+
+            # A viewer joining on another worker is sent the cursors peers already have
+            viewer = _FakeWebSocket()
+            await second.connect(viewer, BOARD_ID, "2")
+            await _until(lambda: viewer.events(WSEventTypes.CURSORS))
+            assert viewer.events(WSEventTypes.CURSORS)[-1] == {"cursors": {"1": {"x": 10, "y": 20}}}
+            assert second.remote_cursors[BOARD_ID] == {"1": {"x": 10, "y": 20}}
+
+            # An expired cursor is removed everywhere as a null entry
+            first._forget_cursor(BOARD_ID, "1")
+            await _until(lambda: viewer.events(WSEventTypes.CURSORS)[-1] == {"cursors": {"1": None}})
+            assert second.remote_cursors[BOARD_ID] == {}
+        finally:
+            await first.cursor_aggregator.stop()
+            await first.backplane.stop()
+            await second.backplane.stop()
+
+    asyncio.run(scenario())
+
+
+class _FakePgConnection:
+    """The parts of an asyncpg connection the backplane uses; NOTIFY goes to every listener."""
+
+    def __init__(self, listeners: list):
+        self.listeners = listeners
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.listeners.append((self, callback))
+
+    async def execute(self, query, channel, payload):
+        if self.closed:
+            raise ConnectionError("connection is closed")
+        for conn, callback in list(self.listeners):
+            if not conn.closed:
+                callback(conn, 0, channel, payload)
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+def test_postgres_backplane_reconnects_after_drops(monkeypatch):
+    monkeypatch.setattr("app.backplane.RECONNECT_DELAY_MIN", 0.01)
+    listeners: list = []
+    opened: list = []
+
+    async def open_connection(self):
+        opened.append(_FakePgConnection(listeners))
+        return opened[-1]
+
+    monkeypatch.setattr(PostgresBackplane, "_open", open_connection)
+
+    async def scenario():
+        sender = ConnectionManager(PostgresBackplane("postgresql://stand-in"))
+        receiver = ConnectionManager(PostgresBackplane("postgresql://stand-in"))
+        await sender.backplane.start(sender._on_backplane_message)
+        await receiver.backplane.start(receiver._on_backplane_message)
+        try:
+            watcher = _watch(receiver)
+            # Drop the receiver's listener and the sender's publisher
+            await receiver.backplane._listen_conn.close()
+            await sender.backplane._publish_conn.close()
+            await _until(lambda: not receiver.backplane._listen_conn.is_closed())
+
+            await sender.broadcast(BOARD_ID, Frame(WSEventTypes.TASK_DELETED, {"id": 7}))
+            await _until(lambda: watcher._queue)
+            assert watcher._queue[0].payload == {"id": 7}
+        finally:
+            await sender.backplane.stop()
+            await receiver.backplane.stop()
+
+    asyncio.run(scenario())
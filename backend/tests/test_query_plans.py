@@ -0,0 +1,143 @@
+"""Every hot query of the API must be served by an index.
+
+Needs a migrated Postgres database (``DATABASE_URL``, ``alembic upgrade
+head``) and is skipped otherwise. Rows are seeded and the statements the
+app runs (``access.py``, ``queries.py``, ``search.py``) are EXPLAINed in one
+transaction that is rolled back, so nothing is left behind. Sequential scans
+are disabled for it, so a plan that still contains one has no usable index.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import with_parent
+from sqlalchemy.sql import Executable
+
+from app import queries
+from app.access import board_role_statement
+from app.database import engine
+from app.models import Board, Task, TaskStatus, TaskTombstone, User, board_members
+from app.search import fts_statement
+
+USERS = 50
+BOARDS_PER_USER = 10
+TASKS_PER_BOARD = 20
+STATUSES = list(TaskStatus)
+
+pytestmark = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="needs a Postgres DATABASE_URL")
+
+
+async def seed(conn) -> Dict[str, int]:
+    """Insert a realistic spread of rows and return ids to query with."""
+    stamp = time.time_ns()
+    user_ids = (await conn.execute(
+        insert(User).returning(User.id),
+        [
+            {"username": f"plan-{stamp}-{i}", "email": f"plan-{stamp}-{i}@bench.local", "hashed_password": "x"}
+            for i in range(USERS)
+        ],
+    )).scalars().all()
+    now = datetime.utcnow()
+    board_ids = (await conn.execute(
+        insert(Board).returning(Board.id),
+        [
+            {
+                "name": f"board {n}",
+                "owner_id": user_ids[n % USERS],
+                "is_public": n % 7 == 0,
+                "created_at": now - timedelta(minutes=n),
+            }
+            for n in range(USERS * BOARDS_PER_USER)
+        ],
+    )).scalars().all()
+    await conn.execute(insert(board_members), [
+        {"user_id": user_ids[(n + 1) % USERS], "board_id": board_id}
+        for n, board_id in enumerate(board_ids)
+    ])
+    task_ids = (await conn.execute(
+        insert(Task).returning(Task.id),
+        [
+            {
+                "title": f"task {i}",
+                "board_id": board_id,
+                "status": STATUSES[i % len(STATUSES)],
+                "position_key": f"V{i:03d}".rstrip("0"),
+            }
+            for board_id in board_ids
+            for i in range(TASKS_PER_BOARD)
+        ],
+    )).scalars().all()
+    await conn.execute(insert(TaskTombstone), [
+        {"task_id": 10_000_000 + n, "board_id": board_id} for n, board_id in enumerate(board_ids)
+    ])
+    await conn.execute(text("ANALYZE"))
+    return {"user_id": user_ids[0], "board_id": board_ids[0], "task_id": task_ids[0]}
+
+
+def hot_queries(user_id: int, board_id: int, task_id: int) -> Dict[str, Executable]:
+    since = datetime.utcnow() - timedelta(minutes=5)
+    board, user = Board(id=board_id), User(id=user_id)
+    return {
+        "access.get_board_role": board_role_statement(board_id, user_id),
+        "boards.get_boards page": queries.accessible_boards_statement(user_id, 51),
+        "boards.get_boards next page": queries.accessible_boards_statement(user_id, 51, (since, board_id)),
+        "boards.get_boards task counts": queries.task_counts_statement([board_id]),
+        "boards.load_board": select(Board).where(Board.id == board_id),
+        # Relationship loads, through the relationships' own join conditions
+        "Board.tasks": select(Task).where(with_parent(board, Board.tasks)),
+        "Board.members": select(User).where(with_parent(board, Board.members)),
+        "User.owned_boards": select(Board).where(with_parent(user, User.owned_boards)),
+        "tasks board tasks": queries.board_tasks_statement([board_id]),
+        "tasks column tail": queries.column_tail_statement(board_id, TaskStatus.TODO),
+        "tasks column tails": queries.column_tails_statement(board_id),
+        "tasks.get_task_changes": queries.changed_tasks_statement(board_id, since),
+        "tasks.get_task_changes tombstones": queries.deleted_task_ids_statement(board_id, since),
+        "tasks.update_task": queries.guarded_task_update_statement(
+            task_id, user_id, {"title": "renamed", "updated_at": since}
+        ),
+        "tasks.delete_task": queries.guarded_task_delete_statement(task_id, user_id),
+        "search.search_tasks": fts_statement("task 7", user_id, limit=21),
+        "search.search_tasks board": fts_statement("task 7", user_id, board_id=board_id, limit=21),
+        "search.search_tasks next page": fts_statement("task 7", user_id, limit=21, after=(0.05, task_id)),
+    }
+
+
+def _nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+async def _plans_with_seq_scans() -> List[str]:
+    failures: List[str] = []
+    try:
+        conn = await engine.connect()
+    except OSError as e:
+        pytest.skip(f"Postgres not reachable: {e}")
+    try:
+        # Seeding and EXPLAIN share this transaction, which is never committed
+        await conn.begin()
+        ids = await seed(conn)
+        await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, stmt in hot_queries(**ids).items():
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            raw = (await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql)).scalar_one()
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            scans = sorted({
+                node.get("Relation Name", "?") for node in _nodes(plan) if node["Node Type"] == "Seq Scan"
+            })
+            if scans:
+                failures.append(f"{name}: seq scan on {', '.join(scans)}")
+        await conn.rollback()
+    finally:
+        await conn.close()
+        await engine.dispose()
+    return failures
+
+
+def test_hot_queries_use_indexes():
+    assert asyncio.run(_plans_with_seq_scans()) == []
@@ -2,13 +2,14 @@ import { useState, useEffect } from 'react';
 import { Board } from './components/Board';
 import { AuthPage } from './components/AuthPage';
 import { AuthProvider, useAuth } from './hooks/useAuth';
-import { Board as BoardType } from './types';
+import { Board as BoardType, BoardSummary, BoardPage } from './types';
 import { Plus, LayoutDashboard, LogOut, Loader2 } from 'lucide-react';
 import { api } from './api';
 
 function AppContent() {
   const { user, token, logout } = useAuth();
-  const [boards, setBoards] = useState<BoardType[]>([]);
+  const [boards, setBoards] = useState<BoardSummary[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [selectedBoard, setSelectedBoard] = useState<BoardType | null>(null);
   const [loading, setLoading] = useState(true);
   const [creating, setCreating] = useState(false);
@@ -28,8 +29,9 @@ function AppContent() {
     setLoading(true);
     setError(null);
     try {
-      const data = await api.get<BoardType[]>('/boards/');
-      setBoards(data);
+      const page = await api.get<BoardPage>('/boards/');
+      setBoards(page.items);
+      setNextCursor(page.next_cursor);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch boards');
     } finally {
@@ -37,6 +39,25 @@ function AppContent() {
     }
   };
 
+  const loadMoreBoards = async () => {
+    if (!nextCursor) return;
+    try {
+      const page = await api.get<BoardPage>(`/boards/?cursor=${encodeURIComponent(nextCursor)}`);
+      setBoards(prev => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to fetch boards');
+    }
+  };
+
+  const openBoard = async (boardId: number) => {
+    try {
+      setSelectedBoard(await api.get<BoardType>(`/boards/${boardId}`));
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to open board');
+    }
+  };
+
   const createBoard = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!newBoardName.trim()) return;
@@ -47,7 +68,8 @@ function AppContent() {
         name: newBoardName.trim(),
         is_public: false
       });
-      setBoards(prev => [newBoard, ...prev]);
+      const counts = { todo: 0, in_progress: 0, review: 0, done: 0 };
+      setBoards(prev => [{ ...newBoard, task_counts: counts }, ...prev]);
       setNewBoardName('');
       setShowNewBoard(false);
       setSelectedBoard(newBoard);
@@ -140,7 +162,7 @@ function AppContent() {
           {boards.map(board => (
             <div
               key={board.id}
-              onClick={() => setSelectedBoard(board)}
+              onClick={() => openBoard(board.id)}
               className="bg-white rounded-xl shadow-sm border border-gray-200 p-6 cursor-pointer hover:shadow-md transition-shadow"
             >
               <h3 className="text-lg font-semibold text-gray-900 mb-2">{board.name}</h3>
@@ -148,13 +170,26 @@ function AppContent() {
                 <p className="text-gray-500 text-sm mb-4">{board.description}</p>
               )}
               <div className="flex items-center justify-between text-sm text-gray-400">
-                <span>{board.tasks.length} tasks</span>
+                <span>
+                  {Object.values(board.task_counts).reduce((sum, n) => sum + n, 0)} tasks
+                </span>
                 <span>Created {new Date(board.created_at).toLocaleDateString()}</span>
               </div>
             </div>
           ))}
         </div>
 
+        {nextCursor && (
+          <div className="text-center mt-6">
+            <button
+              onClick={loadMoreBoards}
+              className="px-4 py-2 border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50"
+            >
+              Load more
+            </button>
+          </div>
+        )}
+
         {boards.length === 0 && (
           <div className="text-center py-12">
             <LayoutDashboard className="w-16 h-16 text-gray-300 mx-auto mb-4" />
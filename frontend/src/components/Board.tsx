@@ -7,7 +7,7 @@ import {
   useSensors,
   closestCorners
 } from '@dnd-kit/core';
-import { Task, TaskStatus, Board as BoardType, WSEvent } from '../types';
+import { Task, TaskStatus, Board as BoardType, TaskBatchResult, WSEvent } from '../types';
 import { Column } from './Column';
 import { AddTaskModal } from './AddTaskModal';
 import { ActiveUsers } from './ActiveUsers';
@@ -41,8 +41,27 @@ export function Board({ board, userId }: BoardProps) {
       case 'task_deleted':
         setTasks(prev => prev.filter(t => t.id !== event.payload.id));
         break;
+      case 'tasks_batch': {
+        const { created, updated, deleted } = event.payload as TaskBatchResult;
+        setTasks(prev => {
+          const changed = new Map<number, Task>(updated.map(t => [t.id, t]));
+          const removed = new Set(deleted);
+          const next = prev
+            .filter(t => !removed.has(t.id))
+            .map(t => changed.get(t.id) ?? t);
+          const known = new Set(next.map(t => t.id));
+          return [...next, ...created.filter(t => !known.has(t.id))];
+        });
+        break;
+      }
+      case 'resync':
+        // Missed too many events while disconnected: reload the board
+        api.get<BoardType>(`/boards/${board.id}`)
+          .then(fresh => setTasks(fresh.tasks))
+          .catch(() => {});
+        break;
     }
-  }, []);
+  }, [board.id]);
 
   const { isConnected, activeUsers, cursors, sendCursorPosition } = useWebSocket({
     boardId: board.id,
@@ -1,56 +1,163 @@
 import { useEffect, useRef, useCallback, useState } from 'react';
 import { WSEvent, CursorPosition } from '../types';
 import { WS_URL } from '../config';
+import { decode, encode } from '../msgpack';
+
+// Preferred first: binary MessagePack frames, with JSON text as the fallback
+const SUBPROTOCOLS = ['collab.msgpack.v1', 'collab.json.v1'];
+
+// Reconnect backoff: exponential with full jitter, so a blip doesn't bring
+// every client back at the same instant
+const RECONNECT_BASE_MS = 1000;
+const RECONNECT_MAX_MS = 30000;
+
+// Cursor moves sent per second until the server announces its own rate
+const DEFAULT_CURSOR_HZ = 25;
+
+/** Delay before the next reconnect, never sooner than the server's retry_after hint. */
+function reconnectDelay(attempt: number, reason: string): number {
+  const backoff = Math.min(RECONNECT_MAX_MS, RECONNECT_BASE_MS * 2 ** attempt);
+  const hint = /retry_after=([\d.]+)/.exec(reason);
+  return (hint ? parseFloat(hint[1]) * 1000 : 0) + Math.random() * backoff;
+}
 
 interface UseWebSocketOptions {
   boardId: number;
   onMessage: (event: WSEvent) => void;
 }
 
+function send(socket: WebSocket, message: object) {
+  socket.send(socket.protocol === 'collab.msgpack.v1' ? encode(message) : JSON.stringify(message));
+}
+
 export function useWebSocket({ boardId, onMessage }: UseWebSocketOptions) {
   const ws = useRef<WebSocket | null>(null);
   const [isConnected, setIsConnected] = useState(false);
   const [activeUsers, setActiveUsers] = useState<string[]>([]);
   const [cursors, setCursors] = useState<Record<string, CursorPosition>>({});
   const reconnectTimeout = useRef<number>();
+  // Position in the board's event log, so a reconnect only replays what was missed
+  const lastSeq = useRef<number | null>(null);
+  const epoch = useRef<string | null>(null);
+  // Presence arrives as deltas; a version gap means one was missed
+  const presenceVersion = useRef(0);
+  const presenceSyncPending = useRef(false);
+  const reconnectAttempts = useRef(0);
+  // Cursor moves are sent at most cursorHz times a second, latest position wins
+  const cursorHz = useRef(DEFAULT_CURSOR_HZ);
+  const pendingCursor = useRef<CursorPosition | null>(null);
+  const cursorFrame = useRef<number | null>(null);
+  const lastCursorSent = useRef(0);
 
   const connect = useCallback(() => {
     if (ws.current?.readyState === WebSocket.OPEN) return;
 
     const token = localStorage.getItem('auth_token') || '';
-    const socket = new WebSocket(`${WS_URL}/${boardId}?token=${encodeURIComponent(token)}`);
+    let url = `${WS_URL}/${boardId}?token=${encodeURIComponent(token)}`;
+    if (epoch.current !== null && lastSeq.current !== null) {
+      url += `&since=${lastSeq.current}&epoch=${encodeURIComponent(epoch.current)}`;
+    }
+    const socket = new WebSocket(url, SUBPROTOCOLS);
+    socket.binaryType = 'arraybuffer';
 
     socket.onopen = () => {
       setIsConnected(true);
     };
 
     socket.onmessage = (event) => {
-      const data: WSEvent = JSON.parse(event.data);
+      const data = (
+        typeof event.data === 'string' ? JSON.parse(event.data) : decode(event.data)
+      ) as WSEvent;
+      if (data.seq !== undefined) {
+        lastSeq.current = data.seq;
+      }
       
       switch (data.type) {
         case 'connection_established':
+          // Admitted (not just opened): later drops start backing off from scratch
+          reconnectAttempts.current = 0;
           setActiveUsers(data.payload.active_users || []);
+          presenceVersion.current = data.payload.presence_version ?? 0;
+          cursorHz.current = data.payload.cursor_hz || DEFAULT_CURSOR_HZ;
+          presenceSyncPending.current = false;
           setCursors(data.payload.cursors || {});
+          if (data.payload.epoch !== epoch.current) {
+            // Fresh log: start from its current position (a resync follows if we were resuming)
+            epoch.current = data.payload.epoch;
+            lastSeq.current = data.payload.seq;
+          }
           break;
-        case 'user_joined':
-        case 'user_left':
+        case 'presence':
           setActiveUsers(data.payload.active_users || []);
+          presenceVersion.current = data.payload.presence_version;
+          presenceSyncPending.current = false;
+          break;
+        case 'resync':
+          epoch.current = data.payload.epoch;
+          lastSeq.current = data.payload.seq;
+          onMessage(data);
           break;
-        case 'cursor_move':
-          setCursors(prev => ({
-            ...prev,
-            [data.payload.user_id]: data.payload.cursor
-          }));
+        case 'user_joined':
+        case 'user_left': {
+          if (data.payload.presence_version !== presenceVersion.current + 1) {
+            // Missed or reordered delta: ask for the full list instead of guessing
+            if (!presenceSyncPending.current) {
+              presenceSyncPending.current = true;
+              send(socket, { type: 'presence_sync', payload: {} });
+            }
+            break;
+          }
+          presenceVersion.current = data.payload.presence_version;
+          const userId: string = data.payload.user_id;
+          setActiveUsers(prev => data.type === 'user_joined'
+            ? (prev.includes(userId) ? prev : [...prev, userId])
+            : prev.filter(id => id !== userId));
+          if (data.type === 'user_left') {
+            setCursors(prev => {
+              const next = { ...prev };
+              delete next[userId];
+              return next;
+            });
+          }
+          break;
+        }
+        case 'ping':
+          // Server heartbeat: answer so the connection is not reaped
+          send(socket, { type: 'pong', payload: {} });
+          break;
+        case 'pong':
           break;
+        case 'cursors': {
+          // Batched positions of every user that moved since the last tick; null drops a cursor
+          const changed = data.payload.cursors as Record<string, CursorPosition | null>;
+          setCursors(prev => {
+            const next = { ...prev };
+            for (const [userId, cursor] of Object.entries(changed)) {
+              if (cursor === null) {
+                delete next[userId];
+              } else {
+                next[userId] = cursor;
+              }
+            }
+            return next;
+          });
+          break;
+        }
         default:
           onMessage(data);
       }
     };
 
-    socket.onclose = () => {
+    socket.onclose = (event) => {
       setIsConnected(false);
+      if (event.code === 4403) {
+        // No access to this board: retrying cannot help
+        return;
+      }
       // Attempt reconnection
-      reconnectTimeout.current = window.setTimeout(connect, 3000);
+      const delay = reconnectDelay(reconnectAttempts.current, event.reason);
+      reconnectAttempts.current += 1;
+      reconnectTimeout.current = window.setTimeout(connect, delay);
     };
 
     socket.onerror = () => {
@@ -60,15 +167,29 @@ export function useWebSocket({ boardId, onMessage }: UseWebSocketOptions) {
     ws.current = socket;
   }, [boardId, onMessage]);
 
-  const sendCursorPosition = useCallback((position: CursorPosition) => {
-    if (ws.current?.readyState === WebSocket.OPEN) {
-      ws.current.send(JSON.stringify({
-        type: 'cursor_move',
-        payload: position
-      }));
+  const flushCursor = useCallback((now: number) => {
+    cursorFrame.current = null;
+    if (now - lastCursorSent.current < 1000 / cursorHz.current) {
+      // Too soon after the last send: try again on the next frame
+      cursorFrame.current = requestAnimationFrame(flushCursor);
+      return;
+    }
+    const socket = ws.current;
+    const position = pendingCursor.current;
+    pendingCursor.current = null;
+    if (position && socket?.readyState === WebSocket.OPEN) {
+      send(socket, { type: 'cursor_move', payload: position });
+      lastCursorSent.current = now;
     }
   }, []);
 
+  const sendCursorPosition = useCallback((position: CursorPosition) => {
+    pendingCursor.current = position;
+    if (cursorFrame.current === null) {
+      cursorFrame.current = requestAnimationFrame(flushCursor);
+    }
+  }, [flushCursor]);
+
   useEffect(() => {
     connect();
 
@@ -76,7 +197,19 @@ export function useWebSocket({ boardId, onMessage }: UseWebSocketOptions) {
       if (reconnectTimeout.current) {
         clearTimeout(reconnectTimeout.current);
       }
-      ws.current?.close();
+      if (ws.current) {
+        // Unmounting: don't schedule a reconnect
+        ws.current.onclose = null;
+        ws.current.close();
+      }
+      if (cursorFrame.current !== null) {
+        cancelAnimationFrame(cursorFrame.current);
+        cursorFrame.current = null;
+      }
+      pendingCursor.current = null;
+      reconnectAttempts.current = 0;
+      lastSeq.current = null;
+      epoch.current = null;
     };
   }, [connect]);
 
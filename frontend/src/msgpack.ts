@@ -0,0 +1,208 @@
+// Minimal MessagePack codec for the binary WebSocket subprotocol.
+// Covers the types the API exchanges: nil, booleans, numbers, strings,
+// binary, arrays and string-keyed maps (no extension types).
+
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+class Writer {
+  private buffer = new Uint8Array(256);
+  private view = new DataView(this.buffer.buffer);
+  length = 0;
+
+  private reserve(size: number) {
+    if (this.length + size <= this.buffer.length) return;
+    let capacity = this.buffer.length * 2;
+    while (capacity < this.length + size) capacity *= 2;
+    const grown = new Uint8Array(capacity);
+    grown.set(this.buffer);
+    this.buffer = grown;
+    this.view = new DataView(grown.buffer);
+  }
+
+  u8(value: number) {
+    this.reserve(1);
+    this.view.setUint8(this.length, value);
+    this.length += 1;
+  }
+
+  u16(value: number) {
+    this.reserve(2);
+    this.view.setUint16(this.length, value);
+    this.length += 2;
+  }
+
+  u32(value: number) {
+    this.reserve(4);
+    this.view.setUint32(this.length, value);
+    this.length += 4;
+  }
+
+  f64(value: number) {
+    this.reserve(8);
+    this.view.setFloat64(this.length, value);
+    this.length += 8;
+  }
+
+  bytes(value: Uint8Array) {
+    this.reserve(value.length);
+    this.buffer.set(value, this.length);
+    this.length += value.length;
+  }
+
+  result(): Uint8Array {
+    return this.buffer.slice(0, this.length);
+  }
+}
+
+function writeLength(out: Writer, length: number, fix: number, fixMax: number, tag8: number | null, tag16: number) {
+  if (length <= fixMax) {
+    out.u8(fix | length);
+  } else if (tag8 !== null && length < 0x100) {
+    out.u8(tag8);
+    out.u8(length);
+  } else if (length < 0x10000) {
+    out.u8(tag16);
+    out.u16(length);
+  } else {
+    out.u8(tag16 + 1);
+    out.u32(length);
+  }
+}
+
+function writeValue(out: Writer, value: unknown) {
+  if (value === null || value === undefined) {
+    out.u8(0xc0);
+  } else if (typeof value === 'boolean') {
+    out.u8(value ? 0xc3 : 0xc2);
+  } else if (typeof value === 'number') {
+    if (Number.isInteger(value) && value >= -0x80000000 && value <= 0xffffffff) {
+      if (value >= 0 && value < 0x80) {
+        out.u8(value);
+      } else if (value < 0 && value >= -32) {
+        out.u8(value & 0xff);
+      } else if (value >= 0) {
+        out.u8(0xce);
+        out.u32(value);
+      } else {
+        out.u8(0xd2);
+        out.u32(value >>> 0);
+      }
+    } else {
+      out.u8(0xcb);
+      out.f64(value);
+    }
+  } else if (typeof value === 'string') {
+    const encoded = textEncoder.encode(value);
+    writeLength(out, encoded.length, 0xa0, 31, 0xd9, 0xda);
+    out.bytes(encoded);
+  } else if (value instanceof Uint8Array) {
+    writeLength(out, value.length, 0, -1, 0xc4, 0xc5);
+    out.bytes(value);
+  } else if (Array.isArray(value)) {
+    writeLength(out, value.length, 0x90, 15, null, 0xdc);
+    value.forEach(item => writeValue(out, item));
+  } else if (typeof value === 'object') {
+    const entries = Object.entries(value as Record<string, unknown>).filter(([, item]) => item !== undefined);
+    writeLength(out, entries.length, 0x80, 15, null, 0xde);
+    for (const [key, item] of entries) {
+      writeValue(out, key);
+      writeValue(out, item);
+    }
+  } else {
+    throw new TypeError(`Cannot encode ${typeof value} as MessagePack`);
+  }
+}
+
+export function encode(value: unknown): Uint8Array {
+  const out = new Writer();
+  writeValue(out, value);
+  return out.result();
+}
+
+class Reader {
+  private offset = 0;
+  private view: DataView;
+
+  constructor(private bytes: Uint8Array) {
+    this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  }
+
+  value(): unknown {
+    const tag = this.view.getUint8(this.offset++);
+    if (tag < 0x80) return tag;
+    if (tag < 0x90) return this.map(tag & 0x0f);
+    if (tag < 0xa0) return this.array(tag & 0x0f);
+    if (tag < 0xc0) return this.str(tag & 0x1f);
+    if (tag >= 0xe0) return tag - 0x100;
+
+    switch (tag) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return this.bin(this.uint(1));
+      case 0xc5: return this.bin(this.uint(2));
+      case 0xc6: return this.bin(this.uint(4));
+      case 0xca: return this.read(4, offset => this.view.getFloat32(offset));
+      case 0xcb: return this.read(8, offset => this.view.getFloat64(offset));
+      case 0xcc: return this.uint(1);
+      case 0xcd: return this.uint(2);
+      case 0xce: return this.uint(4);
+      case 0xcf: return this.read(8, offset => Number(this.view.getBigUint64(offset)));
+      case 0xd0: return this.read(1, offset => this.view.getInt8(offset));
+      case 0xd1: return this.read(2, offset => this.view.getInt16(offset));
+      case 0xd2: return this.read(4, offset => this.view.getInt32(offset));
+      case 0xd3: return this.read(8, offset => Number(this.view.getBigInt64(offset)));
+      case 0xd9: return this.str(this.uint(1));
+      case 0xda: return this.str(this.uint(2));
+      case 0xdb: return this.str(this.uint(4));
+      case 0xdc: return this.array(this.uint(2));
+      case 0xdd: return this.array(this.uint(4));
+      case 0xde: return this.map(this.uint(2));
+      case 0xdf: return this.map(this.uint(4));
+      default:
+        throw new Error(`Unsupported MessagePack type 0x${tag.toString(16)}`);
+    }
+  }
+
+  private read<T>(size: number, get: (offset: number) => T): T {
+    const value = get(this.offset);
+    this.offset += size;
+    return value;
+  }
+
+  private uint(size: 1 | 2 | 4): number {
+    if (size === 1) return this.read(1, offset => this.view.getUint8(offset));
+    if (size === 2) return this.read(2, offset => this.view.getUint16(offset));
+    return this.read(4, offset => this.view.getUint32(offset));
+  }
+
+  private str(length: number): string {
+    return textDecoder.decode(this.bin(length));
+  }
+
+  private bin(length: number): Uint8Array {
+    const value = this.bytes.subarray(this.offset, this.offset + length);
+    this.offset += length;
+    return value;
+  }
+
+  private array(length: number): unknown[] {
+    const items = new Array(length);
+    for (let i = 0; i < length; i++) items[i] = this.value();
+    return items;
+  }
+
+  private map(length: number): Record<string, unknown> {
+    const result: Record<string, unknown> = {};
+    for (let i = 0; i < length; i++) {
+      const key = String(this.value());
+      result[key] = this.value();
+    }
+    return result;
+  }
+}
+
+export function decode(data: ArrayBuffer | Uint8Array): unknown {
+  return new Reader(data instanceof Uint8Array ? data : new Uint8Array(data)).value();
+}
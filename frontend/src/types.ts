@@ -10,7 +10,9 @@ export interface Task {
   title: string;
   description: string | null;
   status: TaskStatus;
+  /** @deprecated No longer written; order by position_key */
   position: number;
+  position_key: string;
   board_id: number;
   assigned_to: string | null;
   created_at: string;
@@ -28,11 +30,35 @@ export interface Board {
   tasks: Task[];
 }
 
+export interface BoardSummary {
+  id: number;
+  name: string;
+  description: string | null;
+  owner_id: number;
+  is_public: boolean;
+  created_at: string;
+  updated_at: string;
+  task_counts: Record<string, number>;
+  tasks?: Task[] | null;
+}
+
+export interface BoardPage {
+  items: BoardSummary[];
+  next_cursor: string | null;
+}
+
+export interface TaskBatchResult {
+  created: Task[];
+  updated: Task[];
+  deleted: number[];
+}
+
 export interface WSEvent {
   type: string;
   payload: any;
   user_id?: string;
   timestamp: string;
+  seq?: number;
 }
 
 export interface CursorPosition {